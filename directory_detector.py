@@ -12,6 +12,7 @@ class DirectoryDetector:
     """目录检测器类"""
 
     def __init__(self):
+        # None 表示尚未检测；空字符串表示已检测但未找到，避免每次调用重复遍历文件系统
         self.astrbot_root = None
         self.plugins_dir = None
         self.data_dir = None
@@ -22,8 +23,8 @@ class DirectoryDetector:
         Returns:
             Optional[str]: AstrBot根目录路径，未找到返回None
         """
-        if self.astrbot_root:
-            return self.astrbot_root
+        if self.astrbot_root is not None:
+            return self.astrbot_root or None
 
         # 从当前插件目录开始向上搜索AstrBot根目录
         current_dir = Path(__file__).parent.absolute()
@@ -43,6 +44,7 @@ class DirectoryDetector:
                 break
             current_dir = current_dir.parent
 
+        self.astrbot_root = ""
         return None
 
     def _is_astrbot_root(self, path: str) -> bool:
@@ -79,8 +81,8 @@ class DirectoryDetector:
         Returns:
             Optional[str]: 插件目录路径，未找到返回None
         """
-        if self.plugins_dir:
-            return self.plugins_dir
+        if self.plugins_dir is not None:
+            return self.plugins_dir or None
 
         try:
             # 获取当前插件目录
@@ -117,6 +119,7 @@ class DirectoryDetector:
             # 使用print代替logger，因为logger未定义
             print(f"获取插件目录时发生错误: {str(e)}")
 
+        self.plugins_dir = ""
         return None
 
     def get_data_directory(self) -> str | None:
@@ -125,8 +128,8 @@ class DirectoryDetector:
         Returns:
             Optional[str]: 数据目录路径，未找到返回None
         """
-        if self.data_dir:
-            return self.data_dir
+        if self.data_dir is not None:
+            return self.data_dir or None
 
         try:
             # 获取当前插件目录
@@ -165,6 +168,7 @@ class DirectoryDetector:
             # 使用print代替logger，因为logger未定义
             print(f"获取数据目录时发生错误: {str(e)}")
 
+        self.data_dir = ""
         return None
 
     def validate_directory_structure(self) -> dict[str, Any]:
@@ -3,15 +3,36 @@ CodeMage插件安装器模块
 负责通过AstrBot API安装生成的插件
 """
 
+import asyncio
 import os
-import tempfile
-import zipfile
 from typing import Any
 
+import aiohttp
 from astrbot.api import AstrBotConfig, logger
 from astrbot.core.utils.astrbot_path import get_astrbot_plugin_path
 from astrbot.core.utils.io import remove_dir
 
+from .utils import json_dumps, json_loads
+
+# HTTP错误时最多读取的响应体字节数（日志中只保留前512个字符）
+_ERROR_BODY_READ_LIMIT = 2048
+
+
+def _write_root_dir_entry(zipf, plugin_root_name: str):
+    """显式写入顶层插件目录，确保ZIP中存在目录项，避免某些安装器误判为文件路径"""
+    import zipfile
+
+    dir_info = zipfile.ZipInfo(f"{plugin_root_name}/")
+    # 设置目录属性（在大多数解压器上不是必须，但更稳妥）
+    dir_info.create_system = 3  # 标记为Unix以使 external_attr 生效
+    dir_info.external_attr = 0o40775 << 16  # drwxrwxr-x
+    zipf.writestr(dir_info, b"")
+
+
+def _json_serialize(obj: Any) -> str:
+    """aiohttp 请求体的JSON序列化函数"""
+    return json_dumps(obj, indent=False)
+
 
 class PluginInstaller:
     """插件安装器类"""
@@ -26,6 +47,59 @@ class PluginInstaller:
         self.token = None
         self.max_retries = config.get("max_retries", 3)
         self._install_timestamp: float | None = None
+        self._session = None
+
+    def _get_session(self):
+        """获取共享的 aiohttp 会话（惰性创建，复用连接池与 DNS 缓存）
+
+        安装了 aiodns 时使用异步 DNS 解析器，未安装时回退到 aiohttp 默认行为。
+
+        Returns:
+            aiohttp.ClientSession: 共享会话
+        """
+        if self._session is None or self._session.closed:
+            try:
+                resolver = aiohttp.AsyncResolver()
+            except Exception:
+                # 未安装 aiodns，使用默认的线程解析器
+                resolver = None
+            connector = aiohttp.TCPConnector(
+                resolver=resolver, ttl_dns_cache=300, limit=32
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                json_serialize=_json_serialize,
+            )
+        return self._session
+
+    async def close(self):
+        """关闭共享会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _read_api_json(self, resp) -> dict[str, Any]:
+        """读取API响应JSON，HTTP错误时跳过解析
+
+        直接解析原始字节（不校验 Content-Type），HTTP错误时只读取有限长度的响应体用于日志，
+        并返回与API失败响应相同结构的字典，调用方无需区分两种失败。
+
+        Args:
+            resp: aiohttp 响应对象
+
+        Returns:
+            Dict[str, Any]: 响应JSON
+        """
+        if resp.status >= 400:
+            # 只读取响应体的开头部分，错误页面再大也不会被完整缓冲
+            body = (await resp.content.read(_ERROR_BODY_READ_LIMIT)).decode(
+                "utf-8", errors="replace"
+            )[:512]
+            self.logger.error(
+                f"❌ AstrBot API返回HTTP {resp.status}: {resp.url.path} {body}"
+            )
+            return {"status": "error", "message": f"HTTP {resp.status}"}
+        return json_loads(await resp.read())
 
     def set_install_timestamp(self, timestamp: float | None = None):
         """设置安装参考时间戳，用于时间窗日志过滤
@@ -44,87 +118,56 @@ class PluginInstaller:
             bool: 是否登录成功
         """
         try:
-            import aiohttp
-
             url = f"{self.astrbot_url}/api/auth/login"
             payload = {"username": self.username, "password": self.password_md5}
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as resp:
-                    result = await resp.json()
-
-                    if result.get("status") == "ok":
-                        self.token = result.get("data", {}).get("token")
-                        self.logger.info("✅ AstrBot API登录成功")
-                        return True
-                    else:
-                        self.logger.error(
-                            f"❌ AstrBot API登录失败: {result.get('message')}"
-                        )
-                        return False
+            session = self._get_session()
+            async with session.post(url, json=payload) as resp:
+                result = await self._read_api_json(resp)
+
+                if result.get("status") == "ok":
+                    self.token = result.get("data", {}).get("token")
+                    self.logger.info("✅ AstrBot API登录成功")
+                    return True
+                else:
+                    self.logger.error(
+                        f"❌ AstrBot API登录失败: {result.get('message')}"
+                    )
+                    return False
 
         except Exception as e:
             self.logger.error(f"❌ AstrBot API登录请求失败: {str(e)}")
             return False
 
-    async def create_plugin_zip(self, plugin_dir: str) -> str | None:
-        """将插件目录打包成zip文件
+    @staticmethod
+    def create_plugin_zip_bytes(plugin_root_name: str, files: dict[str, str]) -> bytes:
+        """直接在内存中将插件文件打包为zip，无需先写入磁盘
 
         Args:
-            plugin_dir: 插件目录路径
+            plugin_root_name: zip 顶层的插件目录名
+            files: 文件名到文件内容的映射
 
         Returns:
-            Optional[str]: zip文件路径，失败返回None
+            bytes: zip文件内容
         """
-        try:
-            # 创建临时zip文件
-            with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp_file:
-                zip_path = tmp_file.name
-
-            # 打包插件目录
-            plugin_root_name = os.path.basename(os.path.normpath(plugin_dir))
-            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                # 显式写入顶层插件目录，确保ZIP中存在目录项，避免某些安装器误判为文件路径
-                if plugin_root_name:
-                    try:
-                        dir_info = zipfile.ZipInfo(f"{plugin_root_name}/")
-                        # 设置目录属性（在大多数解压器上不是必须，但更稳妥）
-                        dir_info.create_system = 3  # 标记为Unix以使 external_attr 生效
-                        dir_info.external_attr = 0o40775 << 16  # drwxrwxr-x
-                        zipf.writestr(dir_info, b"")
-                    except Exception:
-                        # 兼容性兜底：至少写入一个以/结尾的空目录名
-                        zipf.writestr(f"{plugin_root_name}/", b"")
-
-                for root, dirs, files in os.walk(plugin_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        # AstrBot 需要 zip 顶层保留插件目录（plugin_name/main.py 等）
-                        relative_path = os.path.relpath(file_path, plugin_dir).replace(
-                            os.sep, "/"
-                        )
-                        if plugin_root_name:
-                            arcname = f"{plugin_root_name}/{relative_path}"
-                        else:
-                            arcname = relative_path
-                        zipf.write(file_path, arcname)
-
-            structure_hint = f"{plugin_root_name}/..." if plugin_root_name else "根目录"
-            self.logger.info(f"插件打包成功: {zip_path}，ZIP结构: {structure_hint}")
-            return zip_path
-
-        except Exception as e:
-            self.logger.error(f"插件打包失败: {str(e)}")
-            return None
-
-    async def install_plugin(
-        self, zip_path: str, plugin_name: str | None = None
+        import io
+        import zipfile
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
+            _write_root_dir_entry(zipf, plugin_root_name)
+            for name, content in files.items():
+                zipf.writestr(f"{plugin_root_name}/{name}", content)
+        return buffer.getvalue()
+
+    async def install_plugin_bytes(
+        self, zip_bytes: bytes, plugin_name: str
     ) -> dict[str, Any]:
-        """通过API安装插件
+        """通过API安装内存中的插件zip
 
         Args:
-            zip_path: 插件zip文件路径
-            plugin_name: 可选，期望的插件名称（用于避免后端根据随机上传文件名创建随机目录）
+            zip_bytes: 插件zip文件内容
+            plugin_name: 插件目录名，同时用作上传文件名
 
         Returns:
             Dict[str, Any]: 安装结果
@@ -134,78 +177,51 @@ class PluginInstaller:
                 return {"success": False, "error": "API登录失败"}
 
         try:
-            import aiohttp
-
-            url = f"{self.astrbot_url}/api/plugin/install-upload"
-
-            if not os.path.exists(zip_path):
-                return {"success": False, "error": f"文件不存在: {zip_path}"}
-
-            self.logger.info(f"正在通过API安装插件: {zip_path}")
-
-            async with aiohttp.ClientSession() as session:
-                with open(zip_path, "rb") as f:
-                    data = aiohttp.FormData()
-                    # 一些后端会使用上传文件名作为插件目录名，这里显式指定一个稳定的名称
-                    inferred_name = None
-                    if not plugin_name:
-                        try:
-                            with zipfile.ZipFile(zip_path, "r") as zf:
-                                top_levels = set()
-                                for n in zf.namelist():
-                                    if not n:
-                                        continue
-                                    seg = n.split("/")[0].strip()
-                                    if seg:
-                                        top_levels.add(seg)
-                                if len(top_levels) == 1:
-                                    inferred_name = list(top_levels)[0]
-                        except Exception:
-                            inferred_name = None
-                    final_name = plugin_name or inferred_name
-                    upload_filename = (
-                        f"{final_name}.zip"
-                        if final_name
-                        else os.path.basename(zip_path)
-                    )
-                    data.add_field(
-                        "file",
-                        f,
-                        filename=upload_filename,
-                        content_type="application/zip",
-                    )
-
-                    headers = {"Authorization": f"Bearer {self.token}"}
-
-                    async with session.post(url, data=data, headers=headers) as resp:
-                        result = await resp.json()
-
-                        if result.get("status") == "ok":
-                            self.logger.info(
-                                f"✅ 插件安装成功: {result.get('message')}"
-                            )
-                            return {
-                                "success": True,
-                                "plugin_name": result.get("data", {}).get(
-                                    "name", "Unknown"
-                                ),
-                                "plugin_repo": result.get("data", {}).get(
-                                    "repo", "N/A"
-                                ),
-                            }
-                        else:
-                            self.logger.error(
-                                f"❌ 插件安装失败: {result.get('message')}"
-                            )
-                            return {
-                                "success": False,
-                                "error": result.get("message", "Unknown error"),
-                            }
-
+            self.logger.info(f"正在通过API安装插件: {plugin_name}")
+            return await self._upload_plugin_zip(zip_bytes, f"{plugin_name}.zip")
         except Exception as e:
             self.logger.error(f"❌ 插件安装请求失败: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    async def _upload_plugin_zip(
+        self, payload: bytes, upload_filename: str
+    ) -> dict[str, Any]:
+        """上传插件zip并解析安装结果
+
+        Args:
+            payload: zip字节内容
+            upload_filename: 上传文件名
+
+        Returns:
+            Dict[str, Any]: 安装结果
+        """
+        url = f"{self.astrbot_url}/api/plugin/install-upload"
+        data = aiohttp.FormData()
+        data.add_field(
+            "file",
+            payload,
+            filename=upload_filename,
+            content_type="application/zip",
+        )
+        headers = {"Authorization": f"Bearer {self.token}"}
+
+        session = self._get_session()
+        async with session.post(url, data=data, headers=headers) as resp:
+            result = await self._read_api_json(resp)
+
+        if result.get("status") == "ok":
+            self.logger.info(f"✅ 插件安装成功: {result.get('message')}")
+            return {
+                "success": True,
+                "plugin_name": result.get("data", {}).get("name", "Unknown"),
+                "plugin_repo": result.get("data", {}).get("repo", "N/A"),
+            }
+        self.logger.error(f"❌ 插件安装失败: {result.get('message')}")
+        return {
+            "success": False,
+            "error": result.get("message", "Unknown error"),
+        }
+
     async def uninstall_plugin_api(self, plugin_name: str) -> dict[str, Any]:
         """通过API卸载插件
 
@@ -220,26 +236,24 @@ class PluginInstaller:
                 return {"success": False, "error": "API登录失败"}
 
         try:
-            import aiohttp
-
             url = f"{self.astrbot_url}/api/plugin/uninstall"
             payload = {"name": plugin_name}
 
             headers = {"Authorization": f"Bearer {self.token}"}
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers) as resp:
-                    result = await resp.json()
+            session = self._get_session()
+            async with session.post(url, json=payload, headers=headers) as resp:
+                result = await self._read_api_json(resp)
 
-                    if result.get("status") == "ok":
-                        self.logger.info(f"✅ 插件卸载成功: {plugin_name}")
-                        return {"success": True, "message": result.get("message")}
-                    else:
-                        self.logger.error(f"❌ 插件卸载失败: {result.get('message')}")
-                        return {
-                            "success": False,
-                            "error": result.get("message", "Unknown error"),
-                        }
+                if result.get("status") == "ok":
+                    self.logger.info(f"✅ 插件卸载成功: {plugin_name}")
+                    return {"success": True, "message": result.get("message")}
+                else:
+                    self.logger.error(f"❌ 插件卸载失败: {result.get('message')}")
+                    return {
+                        "success": False,
+                        "error": result.get("message", "Unknown error"),
+                    }
 
         except Exception as e:
             self.logger.error(f"❌ 插件卸载请求失败: {str(e)}")
@@ -262,7 +276,9 @@ class PluginInstaller:
             if not os.path.exists(plugin_path):
                 return {"success": False, "error": f"插件目录不存在: {plugin_path}"}
 
-            remove_dir(plugin_path)
+            # remove_dir 内部的 onerror 会为只读文件补写权限后重试一次，
+            # 删除较大的目录树时放到线程中执行，避免阻塞事件循环
+            await asyncio.to_thread(remove_dir, plugin_path)
             self.logger.info(f"✅ 插件文件删除成功: {plugin_path}")
             return {"success": True, "message": f"插件文件已删除: {plugin_path}"}
 
@@ -309,51 +325,48 @@ class PluginInstaller:
                 return {"success": False, "error": "API登录失败"}
 
         try:
-            import aiohttp
-
             headers = {"Authorization": f"Bearer {self.token}"}
+            session = self._get_session()
 
             # 1. 从已加载插件列表检查
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.astrbot_url}/api/plugin/get?name={plugin_name}"
-                async with session.get(url, headers=headers) as resp:
-                    result = await resp.json()
-                    if result.get("status") == "ok":
-                        plugins = result.get("data", [])
-                        if plugins:
-                            p = plugins[0]
+            url = f"{self.astrbot_url}/api/plugin/get?name={plugin_name}"
+            async with session.get(url, headers=headers) as resp:
+                result = await self._read_api_json(resp)
+                if result.get("status") == "ok":
+                    plugins = result.get("data", [])
+                    if plugins:
+                        p = plugins[0]
+                        return {
+                            "success": True,
+                            "loaded": True,
+                            "activated": p.get("activated", True),
+                            "version": p.get("version", ""),
+                            "author": p.get("author", ""),
+                            "desc": p.get("desc", ""),
+                        }
+
+            # 2. 不在已加载列表 → 检查失败插件列表
+            url = f"{self.astrbot_url}/api/plugin/source/get-failed-plugins"
+            async with session.get(url, headers=headers) as resp:
+                result = await self._read_api_json(resp)
+                if result.get("status") == "ok":
+                    failed_dict = result.get("data", {})
+                    for dir_name, err_info in failed_dict.items():
+                        if plugin_name in dir_name or (
+                            isinstance(err_info, dict)
+                            and plugin_name in str(err_info.get("name", ""))
+                        ):
+                            err_msg = (
+                                err_info.get("error", str(err_info))
+                                if isinstance(err_info, dict)
+                                else str(err_info)
+                            )
                             return {
                                 "success": True,
-                                "loaded": True,
-                                "activated": p.get("activated", True),
-                                "version": p.get("version", ""),
-                                "author": p.get("author", ""),
-                                "desc": p.get("desc", ""),
+                                "loaded": False,
+                                "error": err_msg,
                             }
 
-            # 2. 不在已加载列表 → 检查失败插件列表
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.astrbot_url}/api/plugin/source/get-failed-plugins"
-                async with session.get(url, headers=headers) as resp:
-                    result = await resp.json()
-                    if result.get("status") == "ok":
-                        failed_dict = result.get("data", {})
-                        for dir_name, err_info in failed_dict.items():
-                            if plugin_name in dir_name or (
-                                isinstance(err_info, dict)
-                                and plugin_name in str(err_info.get("name", ""))
-                            ):
-                                err_msg = (
-                                    err_info.get("error", str(err_info))
-                                    if isinstance(err_info, dict)
-                                    else str(err_info)
-                                )
-                                return {
-                                    "success": True,
-                                    "loaded": False,
-                                    "error": err_msg,
-                                }
-
             # 3. 两处都找不到 → 未加载
             return {
                 "success": True,
@@ -413,57 +426,53 @@ class PluginInstaller:
             return result
 
         try:
-            import asyncio
-
-            import aiohttp
-
             await asyncio.sleep(2)
 
             headers = {"Authorization": f"Bearer {self.token}"}
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.astrbot_url}/api/log-history", headers=headers
-                ) as resp:
-                    api_result = await resp.json()
-                    if api_result.get("status") != "ok":
-                        return result
-
-                    logs = api_result.get("data", {}).get("logs", [])
-                    error_logs = []
-                    warning_logs = []
-
-                    for entry in logs:
-                        if not isinstance(entry, dict):
-                            continue
-
-                        log_time = entry.get("time", 0)
-                        if log_time < self._install_timestamp:
-                            continue
-
-                        level = entry.get("level", "").upper()
-                        data = entry.get("data", "")
-
-                        if isinstance(data, dict):
-                            message = data.get("message", "")
-                        else:
-                            message = str(data)
-
-                        # 精确插件名匹配
-                        # 插件名如 astrbot_plugin_xxx 足够长且唯一，配以时间窗过滤即可精准匹配
-                        plugin_matches = plugin_name in message
-
-                        if not plugin_matches:
-                            continue
-
-                        if level == "ERROR":
-                            error_logs.append(message)
-                        elif level == "WARNING":
-                            warning_logs.append(message)
-
-                    result["has_errors"] = len(error_logs) > 0
-                    result["has_warnings"] = len(warning_logs) > 0
-                    result["error_logs"] = error_logs[:5]
-                    result["warning_logs"] = warning_logs[:5]
+            session = self._get_session()
+            async with session.get(
+                f"{self.astrbot_url}/api/log-history", headers=headers
+            ) as resp:
+                api_result = await self._read_api_json(resp)
+                if api_result.get("status") != "ok":
+                    return result
+
+                logs = api_result.get("data", {}).get("logs", [])
+                error_logs = []
+                warning_logs = []
+
+                for entry in logs:
+                    if not isinstance(entry, dict):
+                        continue
+
+                    log_time = entry.get("time", 0)
+                    if log_time < self._install_timestamp:
+                        continue
+
+                    level = entry.get("level", "").upper()
+                    data = entry.get("data", "")
+
+                    if isinstance(data, dict):
+                        message = data.get("message", "")
+                    else:
+                        message = str(data)
+
+                    # 精确插件名匹配
+                    # 插件名如 astrbot_plugin_xxx 足够长且唯一，配以时间窗过滤即可精准匹配
+                    plugin_matches = plugin_name in message
+
+                    if not plugin_matches:
+                        continue
+
+                    if level == "ERROR":
+                        error_logs.append(message)
+                    elif level == "WARNING":
+                        warning_logs.append(message)
+
+                result["has_errors"] = len(error_logs) > 0
+                result["has_warnings"] = len(warning_logs) > 0
+                result["error_logs"] = error_logs[:5]
+                result["warning_logs"] = warning_logs[:5]
 
         except Exception as e:
             self.logger.warning(f"日志检查失败（非关键）: {str(e)}")
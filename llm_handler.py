@@ -4,7 +4,13 @@ CodeMage LLM调用处理器模块
 """
 
 import asyncio
+import copy
+import functools
+import hashlib
 import json
+import time
+from collections import OrderedDict
+from pathlib import Path
 from typing import Any
 
 from astrbot.api import AstrBotConfig, logger
@@ -12,12 +18,191 @@ from astrbot.api.star import Context
 
 from .utils import (
     apply_search_replace,
-    extract_code_blocks,
+    compact_markdown,
+    extract_first_code_block,
     extract_codemage_block,
+    json_dumps,
+    json_loads,
     parse_json_response,
     parse_search_replace_blocks,
+    split_markdown_sections,
 )
 
+# 开发文档路径，模块加载时解析一次
+_DEV_DOCS_PATH = Path(__file__).resolve().parent / "merged_plugin_dev_docs.md"
+
+# 结果缓存最多保留的条目数
+_RESULT_CACHE_MAX_ENTRIES = 64
+
+# 修复代码的尝试超过该秒数仍无结果时，追加一次对冲尝试
+_FIX_HEDGE_DELAY_SECONDS = 90.0
+
+# 代码审查结果的 JSON Schema，用于支持结构化输出的提供者
+_REVIEW_RESULT_SCHEMA = {
+    "name": "code_review_result",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "approved": {"type": "boolean"},
+            "satisfaction_score": {"type": "integer"},
+            "reason": {"type": "string"},
+            "issues": {"type": "array", "items": {"type": "string"}},
+            "suggestions": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": [
+            "approved",
+            "satisfaction_score",
+            "reason",
+            "issues",
+            "suggestions",
+        ],
+        "additionalProperties": False,
+    },
+}
+
+# 各类任务需要的开发文档章节（按一级标题前缀匹配）。
+# 文档末尾的AstrBot主配置文件、HTTP API、平台适配器等章节与插件编写无关，不注入提示词
+_DEV_DOC_TOPICS = {
+    "plugin": (
+        "Minimal Example",
+        "AstrBot Plugin Development Guide",
+        "Handling Message Events",
+        "Sending Messages",
+        "AI",
+        "Plugin Configuration",
+        "Session Control",
+        "Plugin Storage",
+        "Text to Image",
+    ),
+    "config": (
+        "Minimal Example",
+        "Plugin Configuration",
+    ),
+    # 审查只需核对注册方式、事件钩子、消息发送与数据目录等框架约定
+    "review": (
+        "Minimal Example",
+        "AstrBot Plugin Development Guide",
+        "Handling Message Events",
+        "Sending Messages",
+        "AI",
+        "Plugin Storage",
+    ),
+}
+
+
+# 结构化结果的必需字段，每项为可接受的字段名（含别名）
+_METADATA_REQUIRED_FIELDS = (("name",), ("description",))
+_REVIEW_REQUIRED_FIELDS = (
+    ("approved", "是否同意", "agree"),
+    ("satisfaction_score", "满意分数", "score"),
+)
+
+
+def _has_required_fields(result: Any, required: tuple[tuple[str, ...], ...]) -> bool:
+    """检查LLM返回的JSON是否为包含全部必需字段的对象
+
+    缺少关键字段的结果视为解析失败，由调用方的重试逻辑重新请求，
+    避免残缺的结果流入后续步骤。
+
+    Args:
+        result: 解析后的JSON
+        required: 必需字段，每项中任意一个字段名存在即可
+
+    Returns:
+        bool: 是否通过校验
+    """
+    return isinstance(result, dict) and all(
+        any(result.get(name) is not None for name in names) for names in required
+    )
+
+
+def _is_response_format_unsupported(error: Exception) -> bool:
+    """判断异常是否表示提供者不支持所请求的响应格式
+
+    Args:
+        error: 调用提供者时抛出的异常
+
+    Returns:
+        bool: 是否为响应格式不受支持
+    """
+    if isinstance(error, NotImplementedError):
+        return True
+    message = str(error).lower()
+    if "response_format" in message or "json_schema" in message:
+        return True
+    # 提供者不接受 response_format 参数时通常抛出 "unexpected keyword argument"，
+    # 其他 TypeError 可能来自提供者内部或参数错误，不能据此关闭结构化输出
+    return isinstance(error, TypeError) and "unexpected keyword" in message
+
+
+def _cached_result(method):
+    """缓存LLM审查方法的解析结果
+
+    以 (提供商ID, 反向提示词, 方法名, 参数) 的哈希为键，在TTL内直接返回上次成功解析的结果。
+    只用于对相同输入应给出相同结论的调用（如代码审查）；生成、修改与修复类方法
+    每次都应得到新的结果，不能使用此缓存。
+    只缓存成功的返回值：解析失败会抛出异常，因此调用方的重试仍会真正请求LLM。
+    同一键的并发调用共享同一个进行中的任务。
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if self.cache_ttl_seconds <= 0:
+            return await method(self, *args, **kwargs)
+
+        key = self._result_cache_key(method.__name__, args, kwargs)
+        cached = self._result_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl_seconds:
+            self._result_cache.move_to_end(key)
+            self.logger.info(f"命中LLM结果缓存: {method.__name__}")
+            # 返回副本，避免调用方修改缓存中的字典
+            return copy.deepcopy(cached[1])
+
+        task = self._result_cache_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(method(self, *args, **kwargs))
+            self._result_cache_inflight[key] = task
+            task.add_done_callback(functools.partial(self._store_cached_result, key))
+        # shield：某个调用方被取消时不影响共享同一任务的其他调用方
+        return copy.deepcopy(await asyncio.shield(task))
+
+    return wrapper
+
+
+class _RateLimiter:
+    """令牌桶限速器，限制每个周期内发出的请求数"""
+
+    def __init__(self, max_rate: int, period: float = 60.0):
+        self.max_rate = max_rate
+        self.period = period
+        self._tokens = float(max_rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> bool:
+        """获取一个令牌，令牌不足时等待补充
+
+        Returns:
+            bool: 是否因限速而等待过
+        """
+        throttled = False
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.max_rate,
+                    self._tokens + (now - self._updated) * self.max_rate / self.period,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return throttled
+                throttled = True
+                await asyncio.sleep(
+                    (1 - self._tokens) * self.period / self.max_rate
+                )
+
 
 class LLMHandler:
     """LLM调用处理器类"""
@@ -27,6 +212,10 @@ class LLMHandler:
         self.config = config
         self.provider_id = config.get("llm_provider_id")
         self.negative_prompt = config.get("negative_prompt", "")
+        # 追加在每个系统提示词末尾的反向提示词
+        self._negative_suffix = (
+            f"\n\n反向提示词：{self.negative_prompt}" if self.negative_prompt else ""
+        )
         self.timeout_seconds = config.get("llm_timeout_seconds", 600)
         self.enable_streaming = config.get("enable_streaming", True)
         self.chunk_timeout = 60  # 流式模式下每个 chunk 的超时秒数
@@ -38,9 +227,77 @@ class LLMHandler:
             self.enable_streaming = False
         self.logger = logger
         self._dev_docs_cache: str | None = None
+        # 保证并发的首次调用只读取一次文档
+        self._dev_docs_lock = asyncio.Lock()
+        # 任务类型 -> 相关开发文档章节
+        self._dev_docs_topics: dict[str, str] = {}
+        # (任务类型, 任务说明) -> 拼接了开发文档的完整系统提示词
+        self._system_prompt_cache: dict[tuple[str, str], str] = {}
+
+        # LLM结果缓存：键 -> (写入时间, 解析结果)
+        self.cache_ttl_seconds = config.get("llm_cache_ttl_seconds", 600)
+        self._result_cache: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        # 进行中的可缓存调用：缓存键 -> 任务
+        self._result_cache_inflight: dict[str, asyncio.Future] = {}
+
+        # 进行中的LLM请求：(提示词, 系统提示词, JSON模式, 结束标记) -> 结果
+        self._inflight: dict[tuple, asyncio.Future] = {}
+
+        # 提供者是否支持 json_schema 响应格式（首次失败后置为False）
+        self._json_schema_supported = True
+
+        # 同时进行的LLM请求上限
+        self._llm_semaphore = asyncio.Semaphore(
+            max(1, config.get("llm_concurrency", 4))
+        )
+        # 每分钟LLM请求上限，0为不限制
+        llm_qpm = config.get("llm_qpm", 500)
+        self._rate_limiter = _RateLimiter(llm_qpm) if llm_qpm > 0 else None
+        # 调用统计：实际发出的请求数与因限速而等待的请求数
+        self._stats = {"calls": 0, "throttled": 0}
+
+    def _result_cache_key(
+        self, method_name: str, args: tuple, kwargs: dict[str, Any]
+    ) -> str:
+        """计算结果缓存键
+
+        Args:
+            method_name: 生成方法名
+            args: 位置参数
+            kwargs: 关键字参数
+
+        Returns:
+            str: 缓存键
+        """
+        raw = json_dumps(
+            [self.provider_id, self.negative_prompt, method_name, args, kwargs],
+            indent=False,
+        )
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _store_cached_result(self, key: str, task: asyncio.Future):
+        """可缓存调用结束时移出进行中列表，成功时写入结果缓存
+
+        Args:
+            key: 缓存键
+            task: 已结束的任务
+        """
+        self._result_cache_inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._result_cache[key] = (time.monotonic(), copy.deepcopy(task.result()))
+        self._result_cache.move_to_end(key)
+        while len(self._result_cache) > _RESULT_CACHE_MAX_ENTRIES:
+            self._result_cache.popitem(last=False)
 
     async def call_llm(
-        self, prompt: str, system_prompt: str = "", expect_json: bool = False
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        expect_json: bool = False,
+        stop_marker: str | None = None,
+        json_schema: dict[str, Any] | None = None,
+        coalesce: bool = True,
     ) -> str:
         """调用LLM
 
@@ -48,6 +305,98 @@ class LLMHandler:
             prompt: 用户提示词
             system_prompt: 系统提示词
             expect_json: 是否期望返回JSON格式
+            stop_marker: 流式模式下的结束标记，收到该标记后立即停止接收
+            json_schema: expect_json 时使用的 JSON Schema 响应格式，提供者不支持时回退到JSON模式
+            coalesce: 是否与进行中的相同请求合并；需要多个独立结果的并发尝试应传 False
+
+        Returns:
+            str: LLM响应内容
+        """
+        if not coalesce:
+            return await self._call_llm_limited(
+                prompt, system_prompt, expect_json, stop_marker, json_schema
+            )
+
+        # 完全相同的请求正在进行时直接等待其结果，不再重复请求
+        key = (prompt, system_prompt, expect_json, stop_marker)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.logger.info("已有相同的LLM请求正在进行，等待其结果")
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # 被取消的是发起请求的调用方而不是当前调用，重新发起请求
+                return await self.call_llm(
+                    prompt, system_prompt, expect_json, stop_marker, json_schema
+                )
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._call_llm_limited(
+                prompt, system_prompt, expect_json, stop_marker, json_schema
+            )
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 标记异常已被获取，避免没有等待者时输出 "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _call_llm_limited(
+        self,
+        prompt: str,
+        system_prompt: str,
+        expect_json: bool,
+        stop_marker: str | None,
+        json_schema: dict[str, Any] | None,
+    ) -> str:
+        """在并发与速率限制下调用LLM
+
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            expect_json: 是否期望返回JSON格式
+            stop_marker: 流式模式下的结束标记
+            json_schema: expect_json 时使用的 JSON Schema 响应格式
+
+        Returns:
+            str: LLM响应内容
+        """
+        # 限制同时进行的LLM请求数与每分钟请求数，避免超出提供商的速率限制
+        async with self._llm_semaphore:
+            if self._rate_limiter is not None and await self._rate_limiter.acquire():
+                self._stats["throttled"] += 1
+            self._stats["calls"] += 1
+            return await self._call_llm(
+                prompt, system_prompt, expect_json, stop_marker, json_schema
+            )
+
+    async def _call_llm(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        expect_json: bool = False,
+        stop_marker: str | None = None,
+        json_schema: dict[str, Any] | None = None,
+    ) -> str:
+        """调用LLM（不经过并发限制）
+
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            expect_json: 是否期望返回JSON格式
+            stop_marker: 流式模式下的结束标记，收到该标记后立即停止接收
+            json_schema: expect_json 时使用的 JSON Schema 响应格式，提供者不支持时回退到JSON模式
 
         Returns:
             str: LLM响应内容
@@ -56,14 +405,15 @@ class LLMHandler:
             raise ValueError("未配置LLM提供商ID")
 
         # 构建完整的系统提示词
-        full_system_prompt = system_prompt
-        if self.negative_prompt:
-            full_system_prompt += f"\n\n反向提示词：{self.negative_prompt}"
+        full_system_prompt = system_prompt + self._negative_suffix
 
-        # 启用了流式模式时优先尝试流式调用，利用逐 chunk 超时避免总响应时间过长而超时
-        if self.enable_streaming:
+        # 启用了流式模式时优先尝试流式调用，利用逐 chunk 超时避免总响应时间过长而超时。
+        # 流式接口无法指定响应格式，需要JSON的请求走非流式调用以使用 JSON/JSON Schema 模式
+        if self.enable_streaming and not expect_json:
             try:
-                return await self._call_llm_stream(prompt, full_system_prompt)
+                return await self._call_llm_stream(
+                    prompt, full_system_prompt, stop_marker
+                )
             except NotImplementedError:
                 # 提供者不支持流式接口，静默回退到非流式
                 self.logger.info(
@@ -80,23 +430,39 @@ class LLMHandler:
         try:
             # 构建额外参数
             extra_kwargs = {}
-            if expect_json:
+            use_json_schema = (
+                expect_json and json_schema is not None and self._json_schema_supported
+            )
+            if use_json_schema:
+                # 按 JSON Schema 约束解码，直接得到结构正确的JSON
+                extra_kwargs["response_format"] = {
+                    "type": "json_schema",
+                    "json_schema": json_schema,
+                }
+            elif expect_json:
                 # 使用 OpenAI 兼容的 JSON 模式参数
                 extra_kwargs["response_format"] = {"type": "json_object"}
 
-            # 使用新 API llm_generate
-            # 显式传递 contexts=[] 确保生成请求是无状态的，不包含之前的对话历史
-            llm_resp = await asyncio.wait_for(
-                self.context.llm_generate(
-                    chat_provider_id=self.provider_id,
-                    prompt=prompt,
-                    system_prompt=full_system_prompt,
-                    contexts=[],
-                    **extra_kwargs,
-                ),
-                timeout=self.timeout_seconds,
-            )
-            return llm_resp.completion_text
+            try:
+                return await self._llm_generate(
+                    prompt, full_system_prompt, extra_kwargs
+                )
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                # 只有确认是响应格式不受支持时才回退；限流、网络或服务端错误原样抛出，
+                # 交给调用方的重试逻辑处理，不影响之后的 json_schema 使用
+                if not use_json_schema or not _is_response_format_unsupported(e):
+                    raise
+                # 提供者不支持 json_schema，之后统一使用 JSON 模式
+                self._json_schema_supported = False
+                self.logger.info(
+                    f"提供者 {self.provider_id} 不支持 json_schema 响应格式，回退到JSON模式: {str(e)}"
+                )
+                extra_kwargs["response_format"] = {"type": "json_object"}
+                return await self._llm_generate(
+                    prompt, full_system_prompt, extra_kwargs
+                )
 
         except asyncio.TimeoutError:
             error_msg = f"LLM调用超时（超过{self.timeout_seconds}秒），请尝试增加llm_timeout_seconds配置值"
@@ -107,8 +473,35 @@ class LLMHandler:
             logger.error(f"LLM调用失败：{str(e)}")
             raise
 
+    async def _llm_generate(
+        self, prompt: str, system_prompt: str, extra_kwargs: dict[str, Any]
+    ) -> str:
+        """以非流式方式调用 llm_generate
+
+        Args:
+            prompt: 用户提示词
+            system_prompt: 完整系统提示词（已包含反向提示词）
+            extra_kwargs: 传给提供者的额外参数
+
+        Returns:
+            str: LLM响应内容
+        """
+        # 使用新 API llm_generate
+        # 显式传递 contexts=[] 确保生成请求是无状态的，不包含之前的对话历史
+        llm_resp = await asyncio.wait_for(
+            self.context.llm_generate(
+                chat_provider_id=self.provider_id,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                contexts=[],
+                **extra_kwargs,
+            ),
+            timeout=self.timeout_seconds,
+        )
+        return llm_resp.completion_text
+
     async def _call_llm_stream(
-        self, prompt: str, system_prompt: str = ""
+        self, prompt: str, system_prompt: str = "", stop_marker: str | None = None
     ) -> str:
         """使用流式方式调用LLM，逐 chunk 接收并累积完整响应。
 
@@ -116,9 +509,13 @@ class LLMHandler:
         因此即使端到端生成时间较长，只要模型持续输出 token 就不会超时。
         仅在模型停滞超过 chunk_timeout 秒时才会超时。
 
+        指定 stop_marker 时（如 ``</codemage:python>``），一旦收到该标记即关闭流并返回，
+        不再等待模型输出标记之后的多余内容。
+
         Args:
             prompt: 用户提示词
             system_prompt: 完整系统提示词（已包含反向提示词）
+            stop_marker: 结束标记
 
         Returns:
             str: 完整的LLM响应文本
@@ -170,8 +567,21 @@ class LLMHandler:
 
                 # 累加 chunk 文本
                 if chunk.completion_text:
+                    # 结束标记可能跨越两个 chunk，只需从上次末尾回退标记长度处开始查找
+                    scan_from = (
+                        max(0, len(accumulated) - len(stop_marker)) if stop_marker else 0
+                    )
                     accumulated += chunk.completion_text
 
+                    if (
+                        stop_marker
+                        and chunk.is_chunk
+                        and accumulated.find(stop_marker, scan_from) != -1
+                    ):
+                        await stream.aclose()
+                        self.logger.info("已收到结束标记，提前结束流式接收")
+                        break
+
                 # 最后一个非 chunk 响应包含完整文本
                 if not chunk.is_chunk and chunk.completion_text:
                     accumulated = chunk.completion_text
@@ -186,45 +596,96 @@ class LLMHandler:
         )
         return accumulated
 
-    def _get_dev_docs(self) -> str:
-        """获取开发文档（带缓存）
+    async def _get_dev_docs(self, topic: str = "plugin") -> str:
+        """获取与任务相关的开发文档章节（带缓存）
+
+        首次读取在线程中进行，避免读取大文件时阻塞事件循环上的其他LLM调用；
+        并发的首次调用由锁串行化，文档只会被读取一次。
+        文档按一级标题拆分后只返回 _DEV_DOC_TOPICS 中该任务需要的章节；
+        若文档结构变化导致一个章节都匹配不到，则返回完整文档。
+
+        Args:
+            topic: 任务类型，见 _DEV_DOC_TOPICS
 
         Returns:
             str: 开发文档内容
         """
         if self._dev_docs_cache is None:
-            try:
-                # 尝试从当前目录读取
-                import os
+            async with self._dev_docs_lock:
+                if self._dev_docs_cache is None:
+                    try:
+                        self._dev_docs_cache = await asyncio.to_thread(
+                            self._read_dev_docs
+                        )
+                    except Exception as e:
+                        self.logger.warning(f"无法读取开发文档: {str(e)}")
+                        self._dev_docs_cache = ""
+
+        docs = self._dev_docs_topics.get(topic)
+        if docs is None:
+            sections = split_markdown_sections(self._dev_docs_cache)
+            prefixes = _DEV_DOC_TOPICS.get(topic, ())
+            selected = [
+                content
+                for title, content in sections.items()
+                if any(title.startswith(prefix) for prefix in prefixes)
+            ]
+            docs = "\n\n".join(selected) if selected else self._dev_docs_cache
+            self._dev_docs_topics[topic] = docs
+        return docs
+
+    def _read_dev_docs(self) -> str:
+        """从插件目录同步读取开发文档，并去除对LLM无用的排版噪声
+
+        Returns:
+            str: 开发文档内容，文件不存在时返回空字符串
+        """
+        try:
+            return compact_markdown(_DEV_DOCS_PATH.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self.logger.warning(f"开发文档不存在: {_DEV_DOCS_PATH}")
+            return ""
 
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                doc_path = os.path.join(current_dir, "merged_plugin_dev_docs.md")
+    async def _with_dev_docs(self, instructions: str, topic: str = "plugin") -> str:
+        """将开发文档作为固定前缀拼接到系统提示词之前
 
-                if os.path.exists(doc_path):
-                    with open(doc_path, encoding="utf-8") as f:
-                        self._dev_docs_cache = f.read()
-                else:
-                    self.logger.warning(f"开发文档不存在: {doc_path}")
-                    self._dev_docs_cache = ""
-            except Exception as e:
-                self.logger.warning(f"无法读取开发文档: {str(e)}")
-                self._dev_docs_cache = ""
+        同一任务类型的系统提示词以逐字节相同的开发文档开头，任务说明与反向提示词位于其后，
+        使提供商的前缀缓存可以在不同步骤和多次调用之间复用。随调用变化的内容（元数据、
+        当前配置等）一律放在用户提示词中，因此拼接结果可按任务说明缓存，避免每次调用都复制整份文档。
 
-        return self._dev_docs_cache
+        Args:
+            instructions: 当前步骤的任务说明（不含随调用变化的内容）
+            topic: 任务类型，决定注入哪些文档章节
+
+        Returns:
+            str: 完整系统提示词
+        """
+        cache_key = (topic, instructions)
+        system_prompt = self._system_prompt_cache.get(cache_key)
+        if system_prompt is None:
+            dev_docs = await self._get_dev_docs(topic)
+            if dev_docs:
+                system_prompt = (
+                    f"# AstrBot插件开发文档\n\n{dev_docs}\n\n---\n\n{instructions}"
+                )
+            else:
+                system_prompt = instructions
+            self._system_prompt_cache[cache_key] = system_prompt
+        return system_prompt
 
     async def generate_plugin_metadata(self, description: str) -> dict[str, Any]:
-        """生成插件元数据和MD文档
+        """生成插件元数据、MD文档和配置文件
+
+        三者在同一次LLM调用中生成，配置文件以JSON文本形式放在返回字典的 config_schema 键中
+        （与 generate_config_schema 的返回格式一致，插件无需配置时为空字符串）。
 
         Args:
             description: 插件描述
 
         Returns:
-            Dict[str, Any]: 包含元数据和MD文档的字典
+            Dict[str, Any]: 包含元数据、MD文档和配置文件的字典
         """
-        # 读取插件开发文档
-        dev_docs = self._get_dev_docs()
-
-        system_prompt = f"""你是一个专业的AstrBot插件开发助手。请根据用户描述生成插件的元数据和Markdown文档。
+        system_prompt = await self._with_dev_docs(f"""你是一个专业的AstrBot插件开发助手。请根据用户描述生成插件的元数据和Markdown文档。
 
 请严格按照以下AstrBot插件开发规范：
 
@@ -232,9 +693,7 @@ class LLMHandler:
 
 - 需包含良好的注释
 - 良好的错误处理，避免插件崩溃
-
-## 开发文档：
-{dev_docs}...
+- 遵守上方的开发文档
 
 请按照以下格式返回，包含在```json和```之间：
 
@@ -248,7 +707,15 @@ class LLMHandler:
     "repo_url": "仓库地址",
     "dependencies": ["依赖1", "依赖2"]
   }},
-  "markdown": "# 插件名称\\n\\n## 插件简介\\n\\n插件功能简要介绍\\n\\n## 功能说明\\n\\n插件提供的具体功能\\n\\n## 插件流程\\n\\n详细说明插件的工作流程和内部逻辑，包括各种情况下的处理过程\\n\\n## 使用方法\\n\\n详细说明如何使用插件的各项功能，包括命令使用示例等\\n\\n## 配置说明\\n\\n插件配置项说明\\n\\n## 注意事项\\n\\n使用插件需要注意的事项和限制"
+  "markdown": "# 插件名称\\n\\n## 插件简介\\n\\n插件功能简要介绍\\n\\n## 功能说明\\n\\n插件提供的具体功能\\n\\n## 插件流程\\n\\n详细说明插件的工作流程和内部逻辑，包括各种情况下的处理过程\\n\\n## 使用方法\\n\\n详细说明如何使用插件的各项功能，包括命令使用示例等\\n\\n## 配置说明\\n\\n插件配置项说明\\n\\n## 注意事项\\n\\n使用插件需要注意的事项和限制",
+  "config_schema": {{
+    "配置项名": {{
+      "description": "配置项描述",
+      "type": "string/int/float/bool/object/list",
+      "hint": "配置项提示信息",
+      "default": "默认值"
+    }}
+  }}
 }}
 ```
 
@@ -258,18 +725,26 @@ class LLMHandler:
 3. 插件流程部分需要详细描述插件的内部工作逻辑
 4. 使用方法部分需要提供具体的使用示例和操作指南
 5. 确保生成的内容符合反向提示词要求：{self.negative_prompt}
-6. 严格按照上述开发规范生成插件结构"""
+6. 严格按照上述开发规范生成插件结构
+7. config_schema 为插件的 _conf_schema.json 内容，需与文档中的配置说明一致；插件不需要配置时返回空对象 {{}}""")
 
         prompt = f"请为以下插件描述生成元数据和Markdown文档：\n\n{description}"
 
         response = await self.call_llm(prompt, system_prompt)
 
         # 解析JSON响应
-        json_match = extract_code_blocks(response)
-        if json_match:
-            json_content = json_match[0]
+        json_content = extract_first_code_block(response)
+        if json_content:
             result = parse_json_response(json_content)
-            if result:
+            if _has_required_fields(result, _METADATA_REQUIRED_FIELDS):
+                # 转换为与 generate_config_schema 相同的JSON文本格式
+                config_schema = result.get("config_schema")
+                if isinstance(config_schema, dict):
+                    result["config_schema"] = (
+                        json_dumps(config_schema) if config_schema else ""
+                    )
+                else:
+                    result.pop("config_schema", None)
                 return result
 
         raise ValueError("无法解析LLM返回的插件元数据")
@@ -283,9 +758,7 @@ class LLMHandler:
         Returns:
             Dict[str, Any]: 插件元数据
         """
-        dev_docs = self._get_dev_docs()
-
-        system_prompt = f"""你是一个专业的AstrBot插件规划助手。请根据用户描述先生成插件的元数据信息，不要生成Markdown文档。
+        system_prompt = await self._with_dev_docs(f"""你是一个专业的AstrBot插件规划助手。请根据用户描述先生成插件的元数据信息，不要生成Markdown文档。
 
 请严格遵守以下要求：
 1. 输出必须是JSON，并放在<codemage:json>和</codemage:json>之间
@@ -300,20 +773,21 @@ class LLMHandler:
        - repo_url: string
        - dependencies: 字符串数组（可为空数组）
 3. 严格遵守反向提示词要求：{self.negative_prompt}
-4. 插件的功能设计必须符合以下开发文档：
-{dev_docs}...
-"""
+4. 插件的功能设计必须符合上方的开发文档
+""")
 
         prompt = f"根据以下描述生成AstrBot插件的元数据：\n\n{description}"
-        response = await self.call_llm(prompt, system_prompt)
+        response = await self.call_llm(
+            prompt, system_prompt, stop_marker="</codemage:json>"
+        )
         json_content = extract_codemage_block(response, "json")
         if json_content:
             metadata = parse_json_response(json_content)
-            if metadata:
+            if _has_required_fields(metadata, _METADATA_REQUIRED_FIELDS):
                 return metadata
 
         metadata = parse_json_response(response)
-        if metadata:
+        if _has_required_fields(metadata, _METADATA_REQUIRED_FIELDS):
             return metadata
 
         raise ValueError("无法解析LLM返回的插件元数据信息")
@@ -330,10 +804,9 @@ class LLMHandler:
         Returns:
             str: Markdown文档内容
         """
-        dev_docs = self._get_dev_docs()
-        metadata_str = json.dumps(metadata, ensure_ascii=False, indent=2)
+        metadata_str = json_dumps(metadata)
 
-        system_prompt = f"""你是一个专业的AstrBot插件技术作家。请根据插件元数据生成详细的Markdown文档。
+        system_prompt = await self._with_dev_docs(f"""你是一个专业的AstrBot插件技术作家。请根据插件元数据生成详细的Markdown文档。
 
 请严格遵守以下要求：
 1. 输出必须放在<codemage:markdown>和</codemage:markdown>之间
@@ -346,12 +819,13 @@ class LLMHandler:
    - 注意事项
 3. 文档内容必须与元数据描述一致，并符合反向提示词要求：{self.negative_prompt}
 4. 插件流程和使用方法部分必须提供足够详细的信息，确保用户能够充分了解插件的工作原理和使用方式
-5. 请参考以下开发文档，确保文档结构和术语符合规范：
-{dev_docs}...
-"""
+5. 请参考上方的开发文档，确保文档结构和术语符合规范
+""")
 
         prompt = f"根据以下插件信息生成Markdown文档：\n\n元数据：\n{metadata_str}\n\n用户描述：\n{description}"
-        response = await self.call_llm(prompt, system_prompt)
+        response = await self.call_llm(
+            prompt, system_prompt, stop_marker="</codemage:markdown>"
+        )
         markdown_content = extract_codemage_block(response, "markdown")
         if markdown_content:
             return markdown_content
@@ -396,16 +870,18 @@ class LLMHandler:
 5. 使用方法部分需要提供具体的使用示例和操作指南
 6. 确保生成的内容符合反向提示词要求：{self.negative_prompt}"""
 
-        current_metadata = json.dumps(metadata, ensure_ascii=False, indent=2)
+        current_metadata = json_dumps(metadata)
         prompt = f"请优化以下插件元数据：\n\n{current_metadata}\n\n用户反馈：{feedback}"
 
-        response = await self.call_llm(prompt, system_prompt)
+        response = await self.call_llm(
+            prompt, system_prompt, stop_marker="</codemage:json>"
+        )
 
         # 解析JSON响应
         json_content = extract_codemage_block(response, "json")
         if json_content:
             result = parse_json_response(json_content)
-            if result:
+            if _has_required_fields(result, _METADATA_REQUIRED_FIELDS):
                 return result
 
         raise ValueError("无法解析LLM返回的优化后插件元数据")
@@ -423,33 +899,25 @@ class LLMHandler:
         Returns:
             str: 插件代码
         """
-        # 读取插件开发文档
-        dev_docs = self._get_dev_docs()
-
-        system_prompt = f"""你是一个专业的AstrBot插件开发助手。请根据插件元数据和Markdown文档生成完整的插件代码。
-## 开发文档：
-{dev_docs}...
+        system_prompt = await self._with_dev_docs(f"""你是一个专业的AstrBot插件开发助手。请根据插件元数据和Markdown文档生成完整的插件代码。
 
 要求：
 1. 生成完整的main.py文件
-2. 代码要符合AstrBot插件开发规范
+2. 代码要符合上方开发文档中的AstrBot插件开发规范
 3. 包含必要的错误处理
 4. 代码要有良好的注释
 5. 确保生成的内容符合反向提示词要求：{self.negative_prompt}
 6. 如果有配置文件，必须在插件的__init__方法中正确接收和使用config参数
 7. 配置项的使用示例：self.config.get("配置项名", "默认值")
 
-配置文件内容（如果有）：
-```json
-{config_schema}
-```
-
-请直接返回Python代码，包含在<codemage:python>和</codemage:python>之间。"""
+请直接返回Python代码，包含在<codemage:python>和</codemage:python>之间。""")
 
-        metadata_str = json.dumps(metadata, ensure_ascii=False, indent=2)
-        prompt = f"请根据以下插件元数据和Markdown文档生成插件代码：\n\n元数据：\n{metadata_str}\n\n文档：\n{markdown}"
+        metadata_str = json_dumps(metadata)
+        prompt = f"请根据以下插件元数据和Markdown文档生成插件代码：\n\n元数据：\n{metadata_str}\n\n文档：\n{markdown}\n\n配置文件内容（如果有）：\n```json\n{config_schema}\n```"
 
-        response = await self.call_llm(prompt, system_prompt)
+        response = await self.call_llm(
+            prompt, system_prompt, stop_marker="</codemage:python>"
+        )
 
         # 提取代码块
         code_content = extract_codemage_block(response, "python")
@@ -458,6 +926,7 @@ class LLMHandler:
 
         raise ValueError("无法从LLM响应中提取插件代码")
 
+    @_cached_result
     async def review_plugin_code(
         self, code: str, metadata: dict[str, Any], markdown: str
     ) -> dict[str, Any]:
@@ -471,12 +940,7 @@ class LLMHandler:
         Returns:
             Dict[str, Any]: 审查结果
         """
-        # 读取插件开发文档
-        dev_docs = self._get_dev_docs()
-
-        negative_prompt = self.config.get("negative_prompt", "")
-
-        system_prompt = f"""# Role: Python Code Review Expert
+        system_prompt = await self._with_dev_docs(f"""# Role: Python Code Review Expert
 
 你是一位资深的 Python 代码审查专家，专注于代码质量、安全性和异步最佳实践。
 
@@ -606,7 +1070,7 @@ class LLMHandler:
 
 审查标准（附加）：
 1. 代码安全性：
-   - 严格检查是否违反反向提示词要求：{negative_prompt}
+   - 严格检查是否违反反向提示词要求：{self.negative_prompt}
 
 2. 功能完整性：
    - 代码是否实现了元数据中描述的所有功能
@@ -619,10 +1083,7 @@ class LLMHandler:
    - 是否包含必要的文档字符串
 
 4. 开发文档合规性：
-   - 代码是否符合AstrBot插件开发文档中的规范
-
-开发文档参考：
-{dev_docs}...
+   - 代码是否符合上方AstrBot插件开发文档中的规范
 
 满意度评分标准（必须严格执行）：
 - 90-100分：优秀，代码完全符合所有标准，可以直接使用
@@ -631,15 +1092,24 @@ class LLMHandler:
 - 60-69分：较差，有较多问题需要修复，需要重大修改
 - 0-59分：不合格，存在严重安全问题或功能缺失，需要重新生成
 
-重要：如果发现任何无法运行的问题或违反反向提示词要求，必须将 approved 设置为 false，并给出详细的问题描述。"""
+重要：如果发现任何无法运行的问题或违反反向提示词要求，必须将 approved 设置为 false，并给出详细的问题描述。""",
+            topic="review",
+        )
 
-        prompt = f"请审查以下插件代码：\n\n代码：\n{code}\n\n元数据：\n{json.dumps(metadata, ensure_ascii=False, indent=2)}\n\n文档：\n{metadata}"
+        # 元数据与文档在审查-修复循环中保持不变，放在代码之前，
+        # 使每轮复审的请求前缀一致，可命中提供商的提示词前缀缓存
+        prompt = f"元数据：\n{json_dumps(metadata)}\n\n文档：\n{markdown}\n\n请审查以下插件代码：\n\n代码：\n{code}"
 
-        response = await self.call_llm(prompt, system_prompt, expect_json=True)
+        response = await self.call_llm(
+            prompt,
+            system_prompt,
+            expect_json=True,
+            json_schema=_REVIEW_RESULT_SCHEMA,
+        )
 
         # 解析JSON响应
         result = parse_json_response(response)
-        if result:
+        if _has_required_fields(result, _REVIEW_REQUIRED_FIELDS):
             return result
 
         raise ValueError("无法解析LLM返回的代码审查结果")
@@ -653,7 +1123,7 @@ class LLMHandler:
             code: 原始代码
             issues: 问题列表
             suggestions: 建议列表
-            max_retries: 最大重试次数
+            max_retries: 最大尝试次数，上一次尝试失败或超时未返回时才追加下一次
 
         Returns:
             str: 修复后的代码
@@ -672,26 +1142,72 @@ class LLMHandler:
         suggestions_str = "\n".join([f"- {suggestion}" for suggestion in suggestions])
         prompt = f"请修复以下插件代码中的问题：\n\n代码：\n{code}\n\n问题：\n{issues_str}\n\n建议：\n{suggestions_str}"
 
-        for attempt in range(max_retries):
-            try:
-                response = await self.call_llm(prompt, system_prompt)
+        # 先只发出一次尝试；失败、未提取到代码或超过对冲延迟仍无结果时才追加下一次尝试，
+        # 取最先成功提取到代码的结果。除第一次外的尝试附加格式提醒，降低再次无法提取代码的概率
+        format_reminder = "\n\n重要：请确保返回的代码包含在<codemage:python>和</codemage:python>之间，不要包含其他内容。"
+        prompts = [prompt] + [prompt + format_reminder] * (max_retries - 1)
+
+        async def _attempt(attempt_prompt: str) -> str | None:
+            # 各次尝试需要相互独立的结果，不能与提示词相同的其他尝试合并为一次请求
+            response = await self.call_llm(
+                attempt_prompt,
+                system_prompt,
+                stop_marker="</codemage:python>",
+                coalesce=False,
+            )
+            return extract_codemage_block(response, "python")
 
-                # 提取代码块
-                code_content = extract_codemage_block(response, "python")
-                if code_content:
-                    return code_content
+        tasks: list[asyncio.Task] = []
+        attempt_numbers: dict[asyncio.Task, int] = {}
+        pending: set[asyncio.Task] = set()
+        last_error: Exception | None = None
+        error_count = 0
 
-                # 如果不是最后一次尝试，修改提示词要求更明确的格式
-                if attempt < max_retries - 1:
-                    prompt += "\n\n重要：请确保返回的代码包含在<codemage:python>和</codemage:python>之间，不要包含其他内容。"
+        def _start_next_attempt():
+            task = asyncio.create_task(_attempt(prompts[len(tasks)]))
+            tasks.append(task)
+            attempt_numbers[task] = len(tasks)
+            pending.add(task)
 
-            except Exception as e:
-                logger.error(
-                    f"修复插件代码失败（尝试 {attempt + 1}/{max_retries}）：{str(e)}"
+        try:
+            _start_next_attempt()
+            while pending:
+                has_more = len(tasks) < len(prompts)
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=_FIX_HEDGE_DELAY_SECONDS if has_more else None,
+                    return_when=asyncio.FIRST_COMPLETED,
                 )
-                if attempt == max_retries - 1:
-                    raise
+                if not done:
+                    logger.info(
+                        f"修复插件代码超过{_FIX_HEDGE_DELAY_SECONDS:.0f}秒仍无结果，追加一次尝试"
+                    )
+                    _start_next_attempt()
+                    continue
 
+                for task in done:
+                    pending.discard(task)
+                    try:
+                        code_content = task.result()
+                    except Exception as e:
+                        last_error = e
+                        error_count += 1
+                        logger.error(
+                            f"修复插件代码失败（尝试 {attempt_numbers[task]}/{max_retries}）：{str(e)}"
+                        )
+                        code_content = None
+                    if code_content:
+                        return code_content
+                    if len(tasks) < len(prompts):
+                        _start_next_attempt()
+        finally:
+            # 已拿到结果或全部失败后取消仍在进行的尝试
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if last_error is not None and error_count == len(tasks):
+            raise last_error
         raise ValueError(
             f"经过{max_retries}次重试，仍无法从LLM响应中提取修复后的插件代码"
         )
@@ -847,9 +1363,7 @@ class LLMHandler:
         Returns:
             str: 配置文件JSON内容
         """
-        dev_docs = self._get_dev_docs()
-
-        system_prompt = f"""你是一个专业的AstrBot插件配置设计助手。请根据插件元数据和功能描述生成插件的配置文件(_conf_schema.json)。
+        system_prompt = await self._with_dev_docs(f"""你是一个专业的AstrBot插件配置设计助手。请根据插件元数据和功能描述生成插件的配置文件(_conf_schema.json)。
 
 请严格遵守以下要求：
 1. 输出必须是JSON格式，并放在<codemage:json>和</codemage:json>之间
@@ -859,8 +1373,7 @@ class LLMHandler:
 5. 确保配置项设计合理，符合AstrBot配置规范
 6. 严格遵守反向提示词要求：{self.negative_prompt}
 7. 设计文档// 请你把这里补充好
-8. 参考以下开发文档，确保配置文件符合规范：
-{dev_docs}...
+8. 参考上方的开发文档，确保配置文件符合规范
 
 请按照以下格式返回：
 <codemage:json>
@@ -885,25 +1398,29 @@ class LLMHandler:
 3. 提供合理的默认值和提示信息
 4. 对于复杂配置项，可以提供options选项列表
 5. 对于需要大量文本的配置项，可以启用editor_mode
-6. 确保生成的内容符合反向提示词要求"""
+6. 确保生成的内容符合反向提示词要求""",
+            topic="config",
+        )
 
-        prompt = f"请为以下插件生成配置文件：\n\n插件元数据：\n{json.dumps(metadata, ensure_ascii=False, indent=2)}\n\n功能描述：\n{description}"
+        prompt = f"请为以下插件生成配置文件：\n\n插件元数据：\n{json_dumps(metadata)}\n\n功能描述：\n{description}"
 
-        response = await self.call_llm(prompt, system_prompt)
+        response = await self.call_llm(
+            prompt, system_prompt, stop_marker="</codemage:json>"
+        )
 
         # 解析JSON响应
         json_content = extract_codemage_block(response, "json")
         if json_content:
             # 验证是否为有效JSON
             try:
-                parsed_config = json.loads(json_content)
+                parsed_config = json_loads(json_content)
                 return json_content
             except json.JSONDecodeError:
                 self.logger.warning("LLM返回的配置文件JSON格式不正确，尝试提取")
                 # 尝试从响应中提取JSON
                 parsed_config = parse_json_response(response)
                 if parsed_config:
-                    return json.dumps(parsed_config, ensure_ascii=False, indent=2)
+                    return json_dumps(parsed_config)
 
         raise ValueError("无法生成有效的插件配置文件")
 
@@ -920,34 +1437,24 @@ class LLMHandler:
         Returns:
             str: 修改后的配置文件内容
         """
-        dev_docs = self._get_dev_docs()
-        system_prompt = f"""你是一个专业的AstrBot插件配置修改助手。请根据用户反馈修改插件的配置文件。
+        system_prompt = await self._with_dev_docs(f"""你是一个专业的AstrBot插件配置修改助手。请根据用户反馈修改插件的配置文件。
 
 请严格遵守以下要求：
 1. 根据用户反馈进行针对性修改
 2. 保持JSON格式正确
 3. 确保配置项设计合理，符合AstrBot配置规范
 4. 严格遵守反向提示词要求：{self.negative_prompt}
-5. 参考以下开发文档，确保配置文件符合规范：
-{dev_docs}...
-
-当前配置文件：
-```json
-{current_config}
-```
-
-插件元数据：
-```json
-{json.dumps(metadata, ensure_ascii=False, indent=2)}
-```
-
-用户反馈：{feedback}
+5. 参考上方的开发文档，确保配置文件符合规范
 
-请直接返回修改后的JSON配置文件内容，包含在<codemage:json>和</codemage:json>之间。"""
+请直接返回修改后的JSON配置文件内容，包含在<codemage:json>和</codemage:json>之间。""",
+            topic="config",
+        )
 
-        prompt = f"请根据用户反馈修改以下插件配置文件：\n\n当前配置：\n{current_config}\n\n插件元数据：\n{json.dumps(metadata, ensure_ascii=False, indent=2)}\n\n用户反馈：\n{feedback}"
+        prompt = f"请根据用户反馈修改以下插件配置文件：\n\n当前配置：\n{current_config}\n\n插件元数据：\n{json_dumps(metadata)}\n\n用户反馈：\n{feedback}"
 
-        response = await self.call_llm(prompt, system_prompt)
+        response = await self.call_llm(
+            prompt, system_prompt, stop_marker="</codemage:json>"
+        )
 
         # 解析JSON响应
         json_content = extract_codemage_block(response, "json")
@@ -969,6 +1476,7 @@ class LLMHandler:
         Returns:
             str: 修改后的Markdown文档内容
         """
+        metadata_str = json_dumps(metadata)
         system_prompt = f"""你是一个专业的AstrBot插件文档修改助手。请根据用户反馈修改插件的Markdown文档。
 
 请严格遵守以下要求：
@@ -977,23 +1485,13 @@ class LLMHandler:
 3. 确保文档内容与元数据描述一致
 4. 严格遵守反向提示词要求：{self.negative_prompt}
 
-当前Markdown文档：
-```markdown
-{current_markdown}
-```
-
-插件元数据：
-```json
-{json.dumps(metadata, ensure_ascii=False, indent=2)}
-```
-
-用户反馈：{feedback}
-
 请直接返回修改后的Markdown文档内容，包含在<codemage:markdown>和</codemage:markdown>之间。"""
 
-        prompt = f"请根据用户反馈修改以下插件Markdown文档：\n\n当前文档：\n{current_markdown}\n\n插件元数据：\n{json.dumps(metadata, ensure_ascii=False, indent=2)}\n\n用户反馈：\n{feedback}"
+        prompt = f"请根据用户反馈修改以下插件Markdown文档：\n\n当前文档：\n{current_markdown}\n\n插件元数据：\n{metadata_str}\n\n用户反馈：\n{feedback}"
 
-        response = await self.call_llm(prompt, system_prompt)
+        response = await self.call_llm(
+            prompt, system_prompt, stop_marker="</codemage:markdown>"
+        )
 
         # 提取Markdown内容
         markdown_content = extract_codemage_block(response, "markdown")
@@ -1014,6 +1512,7 @@ class LLMHandler:
         Returns:
             Dict[str, Any]: 修改后的插件元数据
         """
+        metadata_str = json_dumps(current_metadata)
         system_prompt = f"""你是一个专业的AstrBot插件元数据修改助手。请根据用户反馈修改插件的元数据。
 
 请严格遵守以下要求：
@@ -1022,13 +1521,6 @@ class LLMHandler:
 3. 确保元数据包含必要字段：name、author、description、version、metadata
 4. 严格遵守反向提示词要求：{self.negative_prompt}
 
-当前元数据：
-```json
-{json.dumps(current_metadata, ensure_ascii=False, indent=2)}
-```
-
-用户反馈：{feedback}
-
 请按照以下格式返回修改后的元数据，包含在<codemage:json>和</codemage:json>之间：
 <codemage:json>
 {{
@@ -1056,15 +1548,17 @@ class LLMHandler:
 3. 确保修改后的内容符合插件开发规范
 4. 插件名称格式为 astrbot_plugin_xxx"""
 
-        prompt = f"请根据用户反馈修改以下插件元数据：\n\n当前元数据：\n{json.dumps(current_metadata, ensure_ascii=False, indent=2)}\n\n用户反馈：\n{feedback}"
+        prompt = f"请根据用户反馈修改以下插件元数据：\n\n当前元数据：\n{metadata_str}\n\n用户反馈：\n{feedback}"
 
-        response = await self.call_llm(prompt, system_prompt)
+        response = await self.call_llm(
+            prompt, system_prompt, stop_marker="</codemage:json>"
+        )
 
         # 解析JSON响应
         json_content = extract_codemage_block(response, "json")
         if json_content:
             result = parse_json_response(json_content)
-            if result:
+            if _has_required_fields(result, _METADATA_REQUIRED_FIELDS):
                 return result
 
         raise ValueError("无法修改插件元数据")
@@ -3,7 +3,11 @@ CodeMage - AI驱动的AstrBot插件生成器
 根据用户描述自动生成AstrBot插件
 """
 
+import asyncio
 import hashlib
+import re
+import time
+from collections.abc import Callable
 from typing import Any
 
 from astrbot.api import AstrBotConfig, logger
@@ -16,6 +20,74 @@ from .llm_handler import LLMHandler
 from .plugin_generator import PluginGenerator
 from .utils import validate_plugin_description
 
+# 指令与参数之间的第一个空白
+_FIRST_WHITESPACE_RE = re.compile(r"\s")
+
+# 插件内容修改支持的修改类型
+_MODIFICATION_TYPES = ("配置文件", "文档", "元数据", "全部")
+
+# 固定回复消息
+_MSG_ADMIN_ONLY = "⚠️ 仅管理员可以使用此功能"
+_MSG_NO_PENDING = "当前没有待确认的插件生成任务"
+_MSG_NO_SUSPENDED = "当前没有挂起的任务"
+_MSG_MODIFY_USAGE = "请提供修改内容，例如：/插件内容修改 增加一个用户名配置项 配置文件"
+
+# 挂起任务失败步骤（1-6）的名称
+_STEP_NAMES = ("生成元数据", "生成文档", "生成配置", "生成代码", "代码审查", "安装验证")
+
+# 插件生成状态模板及缺省字段
+_STATUS_TEMPLATE = (
+    "当前插件生成状态：\n"
+    "- 正在生成：是\n"
+    "- 当前步骤：{current_step}\n"
+    "- 总步骤：{total_steps}\n"
+    "- 进度：{progress_percentage}%\n"
+    "- 插件名称：{plugin_name}\n"
+    "- 开始时间：{start_time}"
+)
+_STATUS_DEFAULTS = {"plugin_name": "未知", "start_time": "未知"}
+
+# 事件类型 -> 读取 is_admin 的方式
+_IS_ADMIN_ACCESSORS: dict[type, Callable[[Any], bool]] = {}
+
+
+def _call_is_admin(event: Any) -> bool:
+    """标准方法：event.is_admin()"""
+    return bool(event.is_admin())
+
+
+def _read_is_admin(event: Any) -> bool:
+    """某些实现将 is_admin 作为布尔属性暴露，或根本不提供"""
+    value = getattr(event, "is_admin", False)
+    # 实例上动态挂载的方法同样需要调用，不能直接当作真值
+    return bool(value() if callable(value) else value)
+
+
+def _get_is_admin_accessor(event_type: type) -> Callable[[Any], bool]:
+    """按事件类型解析一次 is_admin 的读取方式并缓存
+
+    Args:
+        event_type: 事件类型
+
+    Returns:
+        Callable[[Any], bool]: 读取事件管理员标记的函数
+    """
+    accessor = _IS_ADMIN_ACCESSORS.get(event_type)
+    if accessor is None:
+        if callable(getattr(event_type, "is_admin", None)):
+            accessor = _call_is_admin
+        else:
+            accessor = _read_is_admin
+        _IS_ADMIN_ACCESSORS[event_type] = accessor
+    return accessor
+
+
+# 管理员ID列表的缓存时间（秒）
+_ADMIN_CACHE_TTL = 30.0
+
+# AstrBot 配置中可能存放管理员 ID 列表的键
+_ADMIN_ID_KEYS = ("admins", "admin_ids", "admin_list", "superusers", "super_users")
+
 
 @register(
     "astrbot_plugin_codemage",
@@ -30,14 +102,30 @@ class CodeMagePlugin(Star):
         self.config = config
         self.llm_handler = LLMHandler(context, config)
         self.installer = PluginInstaller(config)
+        self.directory_detector = DirectoryDetector()
         self.plugin_generator = PluginGenerator(
-            context, config, self.installer, star=self
+            context,
+            config,
+            self.installer,
+            star=self,
+            directory_detector=self.directory_detector,
         )
-        self.directory_detector = DirectoryDetector()
 
         # 初始化logger
         self.logger = logger
 
+        # 常用配置项（AstrBot 保存插件配置后会重载插件，因此只需读取一次）
+        self._admin_only = bool(self.config.get("admin_only", True))
+        self._enable_function_call = bool(
+            self.config.get("enable_function_call", True)
+        )
+
+        # 插件描述 -> 正在执行的函数调用生成任务
+        self._tool_inflight: dict[str, asyncio.Task] = {}
+
+        # (构建时间, 管理员ID集合)
+        self._admin_ids_snapshot: tuple[float, frozenset[str]] | None = None
+
         # 验证配置
         self._validate_config()
 
@@ -56,18 +144,20 @@ class CodeMagePlugin(Star):
         """
         try:
             msg = getattr(event, "message_str", "") or ""
-            msg = str(msg)
+            if not msg:
+                return ""
+            if not isinstance(msg, str):
+                msg = str(msg)
         except Exception:
-            msg = ""
-        msg = msg.strip()
-        if not msg:
             return ""
-        # 按第一个空白分割，后面的原样保留
+        # 只需去掉开头空白即可定位指令结尾，参数部分在返回前统一 strip
+        msg = msg.lstrip()
+        # 按第一个空白切分，后面的原样保留（不构造分割列表）
         # 例如："/生成插件 创建 一个 天气 插件" -> "创建 一个 天气 插件"
-        parts = msg.split(maxsplit=1)
-        if len(parts) < 2:
+        match = _FIRST_WHITESPACE_RE.search(msg)
+        if not match:
             return ""
-        return parts[1].strip()
+        return msg[match.end() :].strip()
 
     def _check_admin_permission(self, event: AstrMessageEvent) -> bool:
         """检查管理员权限
@@ -78,50 +168,93 @@ class CodeMagePlugin(Star):
         Returns:
             bool: 是否有管理员权限
         """
-        if not self.config.get("admin_only", True):
+        if not self._admin_only:
             return True
 
+        try:
+            sender_id = str(event.get_sender_id())
+        except Exception:
+            sender_id = ""
+
         # 优先使用 AstrBot 事件自身提供的管理员判定
         try:
-            # 标准方法：event.is_admin()
-            if hasattr(event, "is_admin"):
-                is_admin_attr = getattr(event, "is_admin")
-                if callable(is_admin_attr):
-                    if is_admin_attr():
-                        return True
-                else:
-                    # 某些实现可能将其作为布尔属性暴露
-                    if bool(is_admin_attr):
-                        return True
+            # event.is_admin() 或布尔属性 event.is_admin，读取方式按事件类型缓存
+            if _get_is_admin_accessor(type(event))(event):
+                return True
 
             # 兼容属性：event.role == "admin"
             role = getattr(event, "role", None)
             if isinstance(role, str) and role.lower() == "admin":
                 return True
         except Exception as e:
-            self.logger.warning(f"检查管理员权限时发生错误: {str(e)}")
+            self.logger.warning("检查管理员权限时发生错误: %s", e)
 
         # 兼容性兜底：从 AstrBot 配置里匹配可能的管理员 ID 列表
+        return bool(sender_id) and sender_id in self._get_admin_ids()
+
+    def _get_admin_ids(self) -> frozenset[str]:
+        """获取 AstrBot 配置中的管理员ID集合（按TTL缓存）
+
+        Returns:
+            frozenset[str]: 管理员ID集合
+        """
+        now = time.monotonic()
+        snapshot = self._admin_ids_snapshot
+        if snapshot and now - snapshot[0] < _ADMIN_CACHE_TTL:
+            return snapshot[1]
+
+        admin_ids: set[str] = set()
         try:
-            sender_id = str(event.get_sender_id())
             astrbot_config = self.context.get_config()
-            for key in (
-                "admins",
-                "admin_ids",
-                "admin_list",
-                "superusers",
-                "super_users",
-            ):
+            for key in _ADMIN_ID_KEYS:
                 ids = astrbot_config.get(key, [])
                 if isinstance(ids, (list, tuple, set)):
-                    if sender_id in {str(i) for i in ids}:
-                        return True
+                    admin_ids.update(str(i) for i in ids)
         except Exception:
             # 忽略兜底检查中的异常
             pass
 
-        # 默认拒绝
-        return False
+        admin_ids_frozen = frozenset(admin_ids)
+        self._admin_ids_snapshot = (now, admin_ids_frozen)
+        return admin_ids_frozen
+
+    async def _check_command_access(
+        self, event: AstrMessageEvent, require_pending: bool = False
+    ) -> str | None:
+        """检查指令的公共前置条件（管理员权限、待确认任务）
+
+        Args:
+            event: 消息事件
+            require_pending: 是否要求存在待确认的插件生成任务
+
+        Returns:
+            str | None: 拒绝执行时返回提示消息，允许执行时返回None
+        """
+        if not self._check_admin_permission(event):
+            return _MSG_ADMIN_ONLY
+        if (
+            require_pending
+            and not await self.plugin_generator.has_pending_generation()
+        ):
+            return _MSG_NO_PENDING
+        return None
+
+    @staticmethod
+    def _format_success_message(result: dict[str, Any]) -> str:
+        """格式化插件生成成功的结果消息
+
+        Args:
+            result: 插件生成流程的返回结果
+
+        Returns:
+            str: 结果消息
+        """
+        message = f"插件生成成功！\n插件名称：{result['plugin_name']}"
+        if result.get("installed"):
+            message += f"\n安装状态：{'✅ 已安装' if result.get('install_success') else '❌ 安装失败'}"
+            if not result.get("install_success"):
+                message += f"\n安装错误：{result.get('install_error', '未知错误')}"
+        return message
 
     @filter.command("生成插件", alias={"create_plugin", "new_plugin"})
     async def generate_plugin_command(self, event: AstrMessageEvent):
@@ -129,9 +262,9 @@ class CodeMagePlugin(Star):
 
         使用完整消息解析，支持空格
         """
-        # 检查管理员权限
-        if not self._check_admin_permission(event):
-            yield event.plain_result("⚠️ 仅管理员可以使用此功能")
+        denial = await self._check_command_access(event)
+        if denial:
+            yield event.plain_result(denial)
             return
 
         # 从完整消息中提取描述，避免空格被截断
@@ -148,22 +281,14 @@ class CodeMagePlugin(Star):
             yield event.plain_result("插件描述不合适，请重新描述")
             return
 
-        # 开始生成流程
+        # 开始生成流程（流程开始时会自行发送“正在生成插件方案...”，此处不再单独提示）
         try:
-            yield event.plain_result("开始生成插件，请稍候...")
             result = await self.plugin_generator.generate_plugin_flow(
                 plugin_description, event
             )
 
             if result["success"]:
-                message = f"插件生成成功！\n插件名称：{result['plugin_name']}"
-                if result.get("installed"):
-                    message += f"\n安装状态：{'✅ 已安装' if result.get('install_success') else '❌ 安装失败'}"
-                    if not result.get("install_success"):
-                        message += (
-                            f"\n安装错误：{result.get('install_error', '未知错误')}"
-                        )
-                yield event.plain_result(message)
+                yield event.plain_result(self._format_success_message(result))
             else:
                 # 检查是否是等待用户确认的情况
                 if result.get("pending_confirmation"):
@@ -174,7 +299,7 @@ class CodeMagePlugin(Star):
                     yield event.plain_result(f"插件生成失败：{result['error']}")
 
         except Exception as e:
-            self.logger.error(f"插件生成过程中发生错误: {str(e)}")
+            self.logger.error("插件生成过程中发生错误: %s", e)
             yield event.plain_result(f"插件生成失败：{str(e)}")
 
     @filter.command("插件生成状态", alias={"plugin_status"})
@@ -183,17 +308,11 @@ class CodeMagePlugin(Star):
         # 获取当前生成状态
         current_status = self.plugin_generator.get_current_status()
 
-        # 当前生成步骤信息
+        # 当前生成步骤信息（仅在生成中时展示，“正在生成”一项恒为“是”）
         if current_status["is_generating"]:
-            status_info = f"""
-当前插件生成状态：
-- 正在生成：{"是" if current_status["is_generating"] else "否"}
-- 当前步骤：{current_status["current_step"]}
-- 总步骤：{current_status["total_steps"]}
-- 进度：{current_status["progress_percentage"]}%
-- 插件名称：{current_status.get("plugin_name", "未知")}
-- 开始时间：{current_status.get("start_time", "未知")}
-            """.strip()
+            status_info = _STATUS_TEMPLATE.format_map(
+                {**_STATUS_DEFAULTS, **current_status}
+            )
         else:
             status_info = "当前没有正在进行的插件生成任务"
 
@@ -211,21 +330,31 @@ class CodeMagePlugin(Star):
         Returns:
             dict: 生成结果
         """
-        if not self.config.get("enable_function_call", True):
+        if not self._enable_function_call:
             return {"error": "函数调用未启用"}
 
         # 检查管理员权限
         if not self._check_admin_permission(event):
             return {"error": "仅管理员可以使用此功能"}
 
-        try:
-            result = await self.plugin_generator.generate_plugin_flow(
-                plugin_description, event
+        # LLM 可能对同一描述重复发起函数调用，此时共享正在执行的生成任务，
+        # 而不是让重复调用因“已有插件正在生成中”而失败
+        task = self._tool_inflight.get(plugin_description)
+        is_leader = task is None
+        if is_leader:
+            task = asyncio.create_task(
+                self.plugin_generator.generate_plugin_flow(plugin_description, event)
             )
-            return result
+            self._tool_inflight[plugin_description] = task
+
+        try:
+            return await (task if is_leader else asyncio.shield(task))
         except Exception as e:
-            self.logger.error(f"函数调用生成插件失败: {str(e)}")
+            self.logger.error("函数调用生成插件失败: %s", e)
             return {"error": str(e)}
+        finally:
+            if is_leader:
+                self._tool_inflight.pop(plugin_description, None)
 
     @filter.command("密码转md5")
     async def md5_convert(self, event: AstrMessageEvent, password: str = ""):
@@ -239,11 +368,14 @@ class CodeMagePlugin(Star):
             return
 
         try:
-            md5_password = hashlib.md5(password.encode()).hexdigest()
+            # api_password_md5 要求MD5；此处仅做格式转换，不用于安全校验
+            md5_password = hashlib.md5(
+                password.encode("utf-8"), usedforsecurity=False
+            ).hexdigest()
             result_message = f"MD5转换结果：\n明文密码：{password}\nMD5密码：{md5_password}\n\n请将MD5密码复制到插件配置中的 api_password_md5 字段"
             yield event.plain_result(result_message)
         except Exception as e:
-            self.logger.error(f"MD5转换失败: {str(e)}")
+            self.logger.error("MD5转换失败: %s", e)
             yield event.plain_result(f"MD5转换失败：{str(e)}")
 
     @filter.command("同意生成", alias={"approve", "confirm"})
@@ -253,15 +385,9 @@ class CodeMagePlugin(Star):
         Args:
             feedback(string): 可选的修改反馈
         """
-        # 检查管理员权限
-        if not self._check_admin_permission(event):
-            yield event.plain_result("⚠️ 仅管理员可以使用此功能")
-            return
-
-        # 获取待确认的任务
-        pending = self.plugin_generator.get_pending_generation()
-        if not pending["active"]:
-            yield event.plain_result("当前没有待确认的插件生成任务")
+        denial = await self._check_command_access(event, require_pending=True)
+        if denial:
+            yield event.plain_result(denial)
             return
 
         # 继续插件生成流程
@@ -272,14 +398,7 @@ class CodeMagePlugin(Star):
             )
 
             if result["success"]:
-                message = f"插件生成成功！\n插件名称：{result['plugin_name']}"
-                if result.get("installed"):
-                    message += f"\n安装状态：{'✅ 已安装' if result.get('install_success') else '❌ 安装失败'}"
-                    if not result.get("install_success"):
-                        message += (
-                            f"\n安装错误：{result.get('install_error', '未知错误')}"
-                        )
-                yield event.plain_result(message)
+                yield event.plain_result(self._format_success_message(result))
             else:
                 if result.get("suspended"):
                     pass
@@ -287,7 +406,7 @@ class CodeMagePlugin(Star):
                     yield event.plain_result(f"插件生成失败：{result['error']}")
                 # 如果是pending_confirmation状态，不显示错误消息，因为这是正常的等待确认流程
         except Exception as e:
-            self.logger.error(f"同意插件生成过程中发生错误: {str(e)}")
+            self.logger.error("同意插件生成过程中发生错误: %s", e)
             yield event.plain_result(f"插件生成失败：{str(e)}")
 
     @filter.command("拒绝生成", alias={"reject", "cancel"})
@@ -297,15 +416,9 @@ class CodeMagePlugin(Star):
         Args:
             无参数
         """
-        # 检查管理员权限
-        if not self._check_admin_permission(event):
-            yield event.plain_result("⚠️ 仅管理员可以使用此功能")
-            return
-
-        # 获取待确认的任务
-        pending = self.plugin_generator.get_pending_generation()
-        if not pending["active"]:
-            yield event.plain_result("当前没有待确认的插件生成任务")
+        denial = await self._check_command_access(event, require_pending=True)
+        if denial:
+            yield event.plain_result(denial)
             return
 
         # 取消插件生成流程
@@ -313,7 +426,7 @@ class CodeMagePlugin(Star):
             await self.plugin_generator.continue_plugin_generation(False, event=event)
             yield event.plain_result("已完全停止插件生成")
         except Exception as e:
-            self.logger.error(f"拒绝插件生成过程中发生错误: {str(e)}")
+            self.logger.error("拒绝插件生成过程中发生错误: %s", e)
             yield event.plain_result(f"停止插件生成失败：{str(e)}")
 
     @filter.command("插件内容修改", alias={"modify_plugin", "modify"})
@@ -324,38 +437,29 @@ class CodeMagePlugin(Star):
         用法：/插件内容修改 修改内容 [配置文件|文档|元数据|全部]
         如果未指定类型，默认为“全部”。
         """
-        # 检查管理员权限
-        if not self._check_admin_permission(event):
-            yield event.plain_result("⚠️ 仅管理员可以使用此功能")
-            return
-
-        # 获取待确认的任务
-        pending = self.plugin_generator.get_pending_generation()
-        if not pending["active"]:
-            yield event.plain_result("当前没有待确认的插件生成任务")
+        denial = await self._check_command_access(event, require_pending=True)
+        if denial:
+            yield event.plain_result(denial)
             return
 
         # 从完整消息中提取参数文本
         args_text = self._get_message_after_command(event)
         if not args_text:
-            yield event.plain_result(
-                "请提供修改内容，例如：/插件内容修改 增加一个用户名配置项 配置文件"
-            )
+            yield event.plain_result(_MSG_MODIFY_USAGE)
             return
 
         # 解析修改类型（若最后一个独立词为合法类型，则作为类型；否则默认为“全部”）
-        valid_types = {"配置文件", "文档", "元数据", "全部"}
         modification_type = "全部"
-        feedback = args_text.strip()
-        parts = args_text.rsplit(None, 1)
-        if len(parts) == 2 and parts[1] in valid_types:
-            feedback = parts[0].strip()
-            modification_type = parts[1]
+        feedback = args_text
+        for valid_type in _MODIFICATION_TYPES:
+            head = args_text[: -len(valid_type)]
+            if args_text.endswith(valid_type) and head[-1:].isspace():
+                feedback = head.strip()
+                modification_type = valid_type
+                break
 
         if not feedback:
-            yield event.plain_result(
-                "请提供修改内容，例如：/插件内容修改 增加一个用户名配置项 配置文件"
-            )
+            yield event.plain_result(_MSG_MODIFY_USAGE)
             return
 
         # 执行修改
@@ -370,7 +474,7 @@ class CodeMagePlugin(Star):
             else:
                 yield event.plain_result(f"修改失败：{result.get('error', '未知错误')}")
         except Exception as e:
-            self.logger.error(f"修改插件内容过程中发生错误: {str(e)}")
+            self.logger.error("修改插件内容过程中发生错误: %s", e)
             yield event.plain_result(f"修改失败：{str(e)}")
 
     @filter.command("继续生成", alias={"resume", "continue"})
@@ -381,18 +485,18 @@ class CodeMagePlugin(Star):
           /继续生成            - 自动恢复唯一挂起任务，或列出多个供选择
           /继续生成 插件名     - 恢复指定插件名的挂起任务
         """
-        if not self._check_admin_permission(event):
-            yield event.plain_result("仅管理员可以使用此功能")
+        denial = await self._check_command_access(event)
+        if denial:
+            yield event.plain_result(denial)
             return
 
-        args_text = self._get_message_after_command(event)
-        target_name = args_text.strip() if args_text else ""
+        target_name = self._get_message_after_command(event)
 
         try:
             suspended_tasks = await self.plugin_generator._list_suspended()
 
             if not suspended_tasks:
-                yield event.plain_result("当前没有挂起的任务")
+                yield event.plain_result(_MSG_NO_SUSPENDED)
                 return
 
             if not target_name:
@@ -400,17 +504,9 @@ class CodeMagePlugin(Star):
                     target_name = suspended_tasks[0].get("plugin_name", "")
                 else:
                     lines = ["当前有多个挂起任务，请指定插件名：\n"]
-                    step_names = [
-                        "生成元数据",
-                        "生成文档",
-                        "生成配置",
-                        "生成代码",
-                        "代码审查",
-                        "安装验证",
-                    ]
                     for t in suspended_tasks:
                         s = t.get("failed_step", 0)
-                        s_desc = step_names[s - 1] if 1 <= s <= 6 else f"步骤{s}"
+                        s_desc = _STEP_NAMES[s - 1] if 1 <= s <= 6 else f"步骤{s}"
                         ts = t.get("timestamp", "未知时间")
                         lines.append(
                             f"  - {t.get('plugin_name', '?')} [{s_desc}] ({ts})"
@@ -425,14 +521,7 @@ class CodeMagePlugin(Star):
             )
 
             if result.get("success"):
-                message = f"插件生成成功！\n插件名称：{result['plugin_name']}"
-                if result.get("installed"):
-                    message += f"\n安装状态：{'已安装' if result.get('install_success') else '安装失败'}"
-                    if not result.get("install_success"):
-                        message += (
-                            f"\n安装错误：{result.get('install_error', '未知错误')}"
-                        )
-                yield event.plain_result(message)
+                yield event.plain_result(self._format_success_message(result))
             elif result.get("pending_confirmation"):
                 pass
             elif result.get("suspended"):
@@ -441,7 +530,7 @@ class CodeMagePlugin(Star):
                 yield event.plain_result(f"恢复失败：{result.get('error', '未知错误')}")
 
         except Exception as e:
-            self.logger.error(f"恢复挂起任务时发生错误: {str(e)}")
+            self.logger.error("恢复挂起任务时发生错误: %s", e)
             yield event.plain_result(f"恢复失败：{str(e)}")
 
     @filter.command("放弃挂起", alias={"abandon_suspended", "cancel_suspended"})
@@ -450,12 +539,12 @@ class CodeMagePlugin(Star):
 
         用法：/放弃挂起 插件名
         """
-        if not self._check_admin_permission(event):
-            yield event.plain_result("仅管理员可以使用此功能")
+        denial = await self._check_command_access(event)
+        if denial:
+            yield event.plain_result(denial)
             return
 
-        args_text = self._get_message_after_command(event)
-        target_name = args_text.strip() if args_text else ""
+        target_name = self._get_message_after_command(event)
 
         if not target_name:
             yield event.plain_result(
@@ -473,35 +562,28 @@ class CodeMagePlugin(Star):
             yield event.plain_result(f"已放弃挂起任务：{target_name}")
 
         except Exception as e:
-            self.logger.error(f"放弃挂起任务时发生错误: {str(e)}")
+            self.logger.error("放弃挂起任务时发生错误: %s", e)
             yield event.plain_result(f"操作失败：{str(e)}")
 
     @filter.command("挂起任务", alias={"suspended_tasks", "挂起列表"})
     async def list_suspended_tasks(self, event: AstrMessageEvent):
         """查看所有挂起的插件生成任务"""
-        if not self._check_admin_permission(event):
-            yield event.plain_result("仅管理员可以使用此功能")
+        denial = await self._check_command_access(event)
+        if denial:
+            yield event.plain_result(denial)
             return
 
         try:
             suspended_tasks = await self.plugin_generator._list_suspended()
 
             if not suspended_tasks:
-                yield event.plain_result("当前没有挂起的任务")
+                yield event.plain_result(_MSG_NO_SUSPENDED)
                 return
 
-            step_names = [
-                "生成元数据",
-                "生成文档",
-                "生成配置",
-                "生成代码",
-                "代码审查",
-                "安装验证",
-            ]
             lines = [f"当前有 {len(suspended_tasks)} 个挂起任务：\n"]
             for t in suspended_tasks:
                 s = t.get("failed_step", 0)
-                s_desc = step_names[s - 1] if 1 <= s <= 6 else f"步骤{s}"
+                s_desc = _STEP_NAMES[s - 1] if 1 <= s <= 6 else f"步骤{s}"
                 ts = t.get("timestamp", "未知时间")
                 desc = t.get("description", "")[:40]
                 err = t.get("error_message", "")[:60]
@@ -516,9 +598,10 @@ class CodeMagePlugin(Star):
             yield event.plain_result("\n".join(lines))
 
         except Exception as e:
-            self.logger.error(f"查看挂起任务时发生错误: {str(e)}")
+            self.logger.error("查看挂起任务时发生错误: %s", e)
             yield event.plain_result(f"查询失败：{str(e)}")
 
     async def terminate(self):
         """插件卸载时调用"""
+        await self.installer.close()
         self.logger.info("CodeMage插件已卸载")
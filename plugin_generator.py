@@ -3,9 +3,14 @@ CodeMage插件生成器模块
 负责协调整个插件生成流程
 """
 
+import asyncio
+import contextlib
+import functools
+import hashlib
 import json
 import os
 import time
+from collections import OrderedDict
 from typing import Any
 
 from astrbot.api import AstrBotConfig, logger
@@ -14,7 +19,90 @@ from astrbot.api.star import Context, Star
 
 from .directory_detector import DirectoryDetector
 from .llm_handler import LLMHandler
-from .utils import create_plugin_directory, format_time, sanitize_plugin_name
+from .utils import (
+    create_plugin_directory,
+    format_time,
+    json_dumps,
+    json_loads,
+    plugin_folder_name,
+    sanitize_plugin_name,
+)
+
+
+# 未提供默认值时按类型展示的默认值
+_TYPE_DEFAULTS = {"int": 0, "float": 0.0, "bool": False, "object": {}, "list": []}
+
+
+@functools.lru_cache(maxsize=64)
+def _canonical_plugin_name(name: str) -> str:
+    """将元数据中的名称转换为规范的插件名（清理后统一带 astrbot_plugin_ 前缀）
+
+    同一任务的各个步骤会反复对同一名称做转换，因此按名称缓存结果。
+
+    Args:
+        name: 元数据中的插件名称
+
+    Returns:
+        str: 规范的插件名
+    """
+    return plugin_folder_name(sanitize_plugin_name(name))
+
+
+# 空的待确认任务中的不可变字段；可变容器在 _empty_pending_generation 中单独创建
+_EMPTY_PENDING = {
+    "active": False,
+    "markdown": "",
+    "config_schema": "",
+    "description": "",
+    "event": None,
+    "umo": "",
+    "timestamp": "",
+    "awaiting_confirmation": False,
+}
+
+
+def _empty_pending_generation() -> dict[str, Any]:
+    """创建空的待确认任务
+
+    Returns:
+        Dict[str, Any]: 空的待确认任务信息
+    """
+    return {**_EMPTY_PENDING, "metadata": {}, "modification_history": []}
+
+
+# 渲染图片缓存最多保留的条目数
+_IMAGE_CACHE_MAX_ENTRIES = 50
+
+# 文档/配置图片的 t2i 模板，由 AstrBot 的 html_render 渲染
+_DOC_TMPL = """
+<div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Helvetica, Arial, 'PingFang SC', 'Hiragino Sans GB', 'Microsoft YaHei', sans-serif; font-size: 14px; color: #222; padding: 16px;">
+  <h2 style="margin:0 0 12px;">{{ title }}</h2>
+  <div style="white-space: pre-wrap; word-break: break-word; overflow-wrap: anywhere; line-height: 1.6;">{{ content }}</div>
+</div>
+"""
+_CONFIG_TMPL = """
+<div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Helvetica, Arial, 'PingFang SC', 'Hiragino Sans GB', 'Microsoft YaHei', sans-serif; font-size: 14px; color: #222; padding: 16px;">
+  <h2 style="margin:0 0 12px;">{{ title }}</h2>
+  <table style="border-collapse: collapse; width: 100%; table-layout: fixed;">
+    <thead>
+      <tr>
+        <th style="border:1px solid #ddd; padding:8px; width:28%;">选项</th>
+        <th style="border:1px solid #ddd; padding:8px;">详细内容</th>
+        <th style="border:1px solid #ddd; padding:8px; width:20%;">默认值</th>
+      </tr>
+    </thead>
+    <tbody>
+    {% for row in rows %}
+      <tr>
+        <td style="border:1px solid #ddd; padding:8px; word-break: break-all;">{{ row.name }}</td>
+        <td style="border:1px solid #ddd; padding:8px; word-break: break-word; white-space: pre-wrap;">{{ row.detail }}</td>
+        <td style="border:1px solid #ddd; padding:8px; word-break: break-all;">{{ row.default }}</td>
+      </tr>
+    {% endfor %}
+    </tbody>
+  </table>
+</div>
+"""
 
 
 class PluginGenerator:
@@ -26,12 +114,14 @@ class PluginGenerator:
         config: AstrBotConfig,
         installer=None,
         star: Star | None = None,
+        directory_detector: DirectoryDetector | None = None,
     ):
         self.context = context
         self.config = config
         self.config_path = getattr(config, "config_path", None)
         self.llm_handler = LLMHandler(context, config)
-        self.directory_detector = DirectoryDetector()
+        # 复用调用方的检测器，使已探测到的目录缓存在各模块间共享
+        self.directory_detector = directory_detector or DirectoryDetector()
         self.installer = installer
         self.logger = logger
         self.star = star
@@ -54,25 +144,22 @@ class PluginGenerator:
             ],
         }
 
+        # 已规范化过的配置文件内容
+        self._canonical_config_schemas: set[str] = set()
+        # 已创建的状态文件目录，避免每次保存都调用 os.makedirs
+        self._state_dir: str | None = None
+        # 最近一次写入状态文件的内容，内容未变化时跳过写入
+        self._last_saved_state: str | None = None
+        # 配置文件中的满意度阈值缓存：((修改时间, 文件大小), 阈值)
+        self._threshold_cache: tuple[tuple[int, int], int] | None = None
+        # 已渲染的文档/配置图片（模板与数据的摘要 -> 图片地址），内容未变化时跳过渲染
+        self._image_cache: OrderedDict[str, str] = OrderedDict()
+
         # 待确认的插件生成任务
-        self.pending_generation = {
-            "active": False,
-            "metadata": {},
-            "markdown": "",
-            "config_schema": "",
-            "description": "",
-            "event": None,
-            "umo": "",
-            "timestamp": "",
-            "awaiting_confirmation": False,
-            "modification_history": [],
-        }
+        self.pending_generation = _empty_pending_generation()
 
         # 初始化时尝试加载持久化的待确认任务
-        try:
-            self._load_pending_state()
-        except Exception:
-            pass
+        self._load_pending_state()
 
     def get_current_status(self) -> dict[str, Any]:
         """获取当前生成状态
@@ -84,12 +171,18 @@ class PluginGenerator:
 
     def _get_satisfaction_threshold(self) -> int:
         """获取满意度阈值，优先从配置文件读取以绕过 AstrBotConfig 内存快照问题。"""
-        # 方式1：从配置文件直接读取
+        # 方式1：从配置文件直接读取，文件未变化（修改时间与大小相同）时复用上次结果
         try:
-            if self.config_path and os.path.exists(self.config_path):
-                with open(self.config_path, encoding="utf-8") as f:
-                    conf = json.load(f)
-                return int(conf.get("satisfaction_threshold", 80))
+            if self.config_path:
+                st = os.stat(self.config_path)
+                stamp = (st.st_mtime_ns, st.st_size)
+                if self._threshold_cache and self._threshold_cache[0] == stamp:
+                    return self._threshold_cache[1]
+                with open(self.config_path, "rb") as f:
+                    conf = json_loads(f.read())
+                threshold = int(conf.get("satisfaction_threshold", 80))
+                self._threshold_cache = (stamp, threshold)
+                return threshold
         except (FileNotFoundError, json.JSONDecodeError, TypeError, ValueError):
             pass
 
@@ -102,12 +195,15 @@ class PluginGenerator:
     # ---- 待确认任务持久化 ----
     def _get_state_dir(self) -> str | None:
         """获取状态文件目录(data/codemage)，若不存在则尝试创建"""
+        if self._state_dir:
+            return self._state_dir
         data_dir = self.directory_detector.get_data_directory()
         if not data_dir:
             return None
         state_dir = os.path.join(data_dir, "codemage")
         try:
             os.makedirs(state_dir, exist_ok=True)
+            self._state_dir = state_dir
         except Exception:
             pass
         return state_dir
@@ -119,8 +215,12 @@ class PluginGenerator:
             return None
         return os.path.join(state_dir, "pending_generation.json")
 
-    def _save_pending_state(self):
-        """将待确认任务持久化到文件（不保存 event 对象）"""
+    async def _save_pending_state(self):
+        """将待确认任务持久化到文件（不保存 event 对象）
+
+        序列化在事件循环中完成（保证写入的是调用时的状态快照），文件写入放到线程中，
+        先写临时文件再原子替换，避免崩溃时留下不完整的状态文件。
+        """
         try:
             path = self._get_state_file_path()
             if not path:
@@ -141,42 +241,86 @@ class PluginGenerator:
                     "modification_history", []
                 ),
             }
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            content = json_dumps(data)
+            if content == self._last_saved_state:
+                return
+            await asyncio.to_thread(self._write_state_file, path, content)
+            self._last_saved_state = content
         except Exception as e:
             self.logger.warning(f"保存待确认状态失败: {str(e)}")
 
-    def _load_pending_state(self):
-        """从文件加载待确认任务（不会恢复 event 对象）"""
+    @staticmethod
+    def _write_state_file(path: str, content: str):
+        """先写入临时文件再原子替换目标文件
+
+        Args:
+            path: 状态文件路径
+            content: 文件内容
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _read_pending_state(self) -> dict[str, Any] | None:
+        """读取持久化的待确认任务文件
+
+        Returns:
+            Optional[Dict[str, Any]]: 文件内容，文件不存在或读取失败时返回None
+        """
         try:
             path = self._get_state_file_path()
-            if not path or not os.path.exists(path):
-                return
-            with open(path, encoding="utf-8") as f:
-                data = json.load(f)
-            # 合并状态
-            self.pending_generation.update(
-                {
-                    "active": data.get("active", False),
-                    "metadata": data.get("metadata", {}),
-                    "markdown": data.get("markdown", ""),
-                    "config_schema": data.get("config_schema", ""),
-                    "description": data.get("description", ""),
-                    "umo": data.get("umo", ""),
-                    "timestamp": data.get("timestamp", ""),
-                    "awaiting_confirmation": data.get("awaiting_confirmation", False),
-                    "modification_history": data.get("modification_history", []),
-                }
-            )
+            if not path:
+                return None
+            with open(path, "rb") as f:
+                return json_loads(f.read())
+        except FileNotFoundError:
+            return None
         except Exception as e:
             self.logger.warning(f"加载待确认状态失败: {str(e)}")
+            return None
+
+    def _apply_pending_state(self, data: dict[str, Any] | None):
+        """将读取到的待确认任务合并到内存状态（不会恢复 event 对象）
+
+        Args:
+            data: _read_pending_state 读取到的内容
+        """
+        if not isinstance(data, dict):
+            return
+        self.pending_generation.update(
+            {
+                "active": data.get("active", False),
+                "metadata": data.get("metadata", {}),
+                "markdown": data.get("markdown", ""),
+                "config_schema": data.get("config_schema", ""),
+                "description": data.get("description", ""),
+                "umo": data.get("umo", ""),
+                "timestamp": data.get("timestamp", ""),
+                "awaiting_confirmation": data.get("awaiting_confirmation", False),
+                "modification_history": data.get("modification_history", []),
+            }
+        )
+
+    def _load_pending_state(self):
+        """从文件同步加载待确认任务（用于初始化等无法 await 的场景）
+
+        读取失败时只记录警告，不会抛出异常。
+        """
+        self._apply_pending_state(self._read_pending_state())
+
+    async def _reload_pending_state(self):
+        """在线程中读取状态文件后合并到内存状态，避免阻塞事件循环"""
+        self._apply_pending_state(await asyncio.to_thread(self._read_pending_state))
 
     def _delete_pending_state(self):
         """删除持久化的待确认任务文件"""
+        self._last_saved_state = None
         try:
             path = self._get_state_file_path()
-            if path and os.path.exists(path):
-                os.remove(path)
+            if path:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
         except Exception as e:
             self.logger.warning(f"删除待确认状态文件失败: {str(e)}")
 
@@ -298,6 +442,31 @@ class PluginGenerator:
             self.logger.error(f"列出挂起任务失败: {str(e)}", exc_info=True)
             return []
 
+    async def _call_with_retry(
+        self, max_retries: int, func, *args: Any
+    ) -> tuple[Any, Exception | None]:
+        """按最大重试次数调用生成函数
+
+        Args:
+            max_retries: 最大重试次数，-1为无限
+            func: 异步生成函数
+            *args: 传给生成函数的参数
+
+        Returns:
+            Tuple[Any, Optional[Exception]]: (结果, 重试耗尽时的最后一个异常)，成功时异常为None
+        """
+        retry_count = 0
+        while True:
+            try:
+                return await func(*args), None
+            except Exception as err:
+                retry_count += 1
+                if max_retries != -1 and retry_count > max_retries:
+                    return None, err
+                self.logger.warning(
+                    f"生成失败，重试 {retry_count}/{max_retries}：{str(err)}"
+                )
+
     def _update_status(self, step: int, plugin_name: str = ""):
         """更新生成状态
 
@@ -312,17 +481,6 @@ class PluginGenerator:
         if plugin_name:
             self.generation_status["plugin_name"] = plugin_name
 
-    def _build_step_message(self) -> str:
-        """构建当前步骤提示信息"""
-        current_step = self.generation_status.get("current_step", 0)
-        total_steps = self.generation_status.get("total_steps", 0)
-        if not current_step:
-            return ""
-        descriptions = self.generation_status.get("step_descriptions", [])
-        index = max(0, min(current_step - 1, len(descriptions) - 1))
-        description = descriptions[index] if descriptions else ""
-        return f"步骤{current_step}/{total_steps}：{description}"
-
     def _build_preview_text(
         self, meta: dict[str, Any], markdown: str, config_schema: str
     ) -> str:
@@ -356,46 +514,51 @@ class PluginGenerator:
         return "\n".join(lines)
 
     def _normalize_config_schema(self, config_schema: str) -> str:
-        """规范化配置文件内容"""
+        """规范化配置文件内容
+
+        已经由本方法规范化过的内容（如挂起/恢复、修改流程中再次传入的配置）直接返回，
+        避免重复解析与序列化。
+        """
         if not config_schema or not config_schema.strip():
             return ""
+        if config_schema in self._canonical_config_schemas:
+            return config_schema
         try:
-            parsed = json.loads(config_schema)
-            return json.dumps(parsed, ensure_ascii=False, indent=2)
+            normalized = json_dumps(json_loads(config_schema))
         except json.JSONDecodeError:
             return config_schema
+        if len(self._canonical_config_schemas) >= 32:
+            self._canonical_config_schemas.clear()
+        self._canonical_config_schemas.add(normalized)
+        return normalized
 
     def _format_default_value(self, item_schema: dict[str, Any]) -> str:
         """将默认值格式化为可读字符串（布尔值显示为[x]/[ ]）"""
         default = item_schema.get("default", None)
         t = (item_schema.get("type") or "").lower()
-        if default is None:
-            if t == "int":
-                default = 0
-            elif t == "float":
-                default = 0.0
-            elif t == "bool":
-                default = False
-            elif t == "object":
-                default = {}
-            elif t == "list":
-                default = []
-            else:
-                default = ""
         if t == "bool":
             return "[x]" if bool(default) else "[ ]"
+        if default is None:
+            default = _TYPE_DEFAULTS.get(t, "")
         try:
             return json.dumps(default, ensure_ascii=False)
         except Exception:
             return str(default)
 
     def _build_config_rows(self, schema: dict[str, Any]) -> list[dict[str, str]]:
-        """从 _conf_schema.json 的 schema 构建人类可读的表格行"""
-        rows: list[dict[str, str]] = []
+        """从 _conf_schema.json 的 schema 构建人类可读的表格行
 
-        def walk(item_key: str, item: dict[str, Any], parent_label: str | None = None):
+        使用显式栈按先序遍历嵌套的 object 配置项（子项按原顺序紧跟在父项之后）。
+        """
+        rows: list[dict[str, str]] = []
+        stack = [
+            (key, item, None)
+            for key, item in reversed(list((schema or {}).items()))
+            if isinstance(item, dict)
+        ]
+        while stack:
+            item_key, item, parent_label = stack.pop()
             desc = item.get("description") or item_key
-            name_label = f"{parent_label} > {desc}" if parent_label else desc
             hint = item.get("hint")
             t = item.get("type", "")
             options = item.get("options")
@@ -406,31 +569,52 @@ class PluginGenerator:
                 detail_parts.append(str(hint))
             if t:
                 detail_parts.append(f"类型: {t}")
-            if options and isinstance(options, list) and options:
+            if options and isinstance(options, list):
                 try:
                     opts = ", ".join([str(o) for o in options])
                 except Exception:
                     opts = str(options)
                 detail_parts.append(f"可选项: {opts}")
-            default_str = self._format_default_value(item)
             rows.append(
                 {
-                    "name": name_label,
-                    "detail": "\n".join(detail_parts) if detail_parts else "",
-                    "default": default_str,
+                    "name": f"{parent_label} > {desc}" if parent_label else desc,
+                    "detail": "\n".join(detail_parts),
+                    "default": self._format_default_value(item),
                 }
             )
-            if (item.get("type") == "object") and isinstance(item.get("items"), dict):
-                for sub_key, sub_item in item.get("items").items():
-                    if isinstance(sub_item, dict):
-                        parent_name = item.get("description") or item_key
-                        walk(sub_key, sub_item, parent_label=parent_name)
-
-        for key, item in (schema or {}).items():
-            if isinstance(item, dict):
-                walk(key, item, parent_label=None)
+            sub_items = item.get("items")
+            if t == "object" and isinstance(sub_items, dict):
+                stack.extend(
+                    (sub_key, sub_item, desc)
+                    for sub_key, sub_item in reversed(list(sub_items.items()))
+                    if isinstance(sub_item, dict)
+                )
         return rows
 
+    async def _html_render_cached(self, template: str, data: dict[str, Any]) -> str:
+        """渲染 HTML 模板为图片，模板与数据均未变化时复用上次的渲染结果
+
+        Args:
+            template: HTML 模板
+            data: 模板数据
+
+        Returns:
+            str: 图片地址
+        """
+        key = hashlib.blake2b(
+            f"{template}\0{json_dumps(data, indent=False)}".encode(),
+            digest_size=16,
+        ).hexdigest()
+        url = self._image_cache.get(key)
+        if url is not None:
+            self._image_cache.move_to_end(key)
+            return url
+        url = await self.star.html_render(template, data)
+        self._image_cache[key] = url
+        while len(self._image_cache) > _IMAGE_CACHE_MAX_ENTRIES:
+            self._image_cache.popitem(last=False)
+        return url
+
     async def _send_doc_and_config_images(
         self,
         event: AstrMessageEvent,
@@ -438,71 +622,40 @@ class PluginGenerator:
         markdown: str,
         config_schema: str,
     ):
-        """使用 AstrBot 的 t2i 将文档与配置以图片形式发送，并将配置转成可读表格"""
+        """使用 AstrBot 的 t2i 将文档与配置以图片形式发送，并将配置转成可读表格
+
+        文档与配置图片并发渲染，渲染完成后按文档、配置的顺序发送。
+        """
         if not self.star:
             return
-        # 发送文档图片
-        doc_text = (markdown or "").strip()
-        if doc_text:
+        name = metadata.get("name", "插件")
+
+        async def render_doc(doc_text: str):
             try:
-                DOC_TMPL = """
-<div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Helvetica, Arial, 'PingFang SC', 'Hiragino Sans GB', 'Microsoft YaHei', sans-serif; font-size: 14px; color: #222; padding: 16px;">
-  <h2 style="margin:0 0 12px;">{{ title }}</h2>
-  <div style="white-space: pre-wrap; word-break: break-word; overflow-wrap: anywhere; line-height: 1.6;">{{ content }}</div>
-</div>
-"""
-                title = f"{metadata.get('name', '插件')} 文档"
-                url = await self.star.html_render(
-                    DOC_TMPL, {"title": title, "content": doc_text}
+                url = await self._html_render_cached(
+                    _DOC_TMPL, {"title": f"{name} 文档", "content": doc_text}
                 )
-                await event.send(event.image_result(url))
+                return event.image_result(url)
             except Exception:
                 # 回退到简单的文本转图
                 try:
-                    url = await self.star.text_to_image(
-                        f"{metadata.get('name', '插件')} 文档\n\n{doc_text}"
-                    )
-                    await event.send(event.image_result(url))
+                    url = await self.star.text_to_image(f"{name} 文档\n\n{doc_text}")
+                    return event.image_result(url)
                 except Exception:
-                    await event.send(event.plain_result(doc_text[:1800]))
-        # 发送配置图片
-        cfg_text = (config_schema or "").strip()
-        if cfg_text:
+                    return event.plain_result(doc_text[:1800])
+
+        async def render_config(cfg_text: str):
             try:
-                schema_obj = json.loads(cfg_text)
+                schema_obj = json_loads(cfg_text)
             except Exception:
                 schema_obj = None
             if isinstance(schema_obj, dict):
                 rows = self._build_config_rows(schema_obj)
                 try:
-                    CONFIG_TMPL = """
-<div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Helvetica, Arial, 'PingFang SC', 'Hiragino Sans GB', 'Microsoft YaHei', sans-serif; font-size: 14px; color: #222; padding: 16px;">
-  <h2 style="margin:0 0 12px;">{{ title }}</h2>
-  <table style="border-collapse: collapse; width: 100%; table-layout: fixed;">
-    <thead>
-      <tr>
-        <th style="border:1px solid #ddd; padding:8px; width:28%;">选项</th>
-        <th style="border:1px solid #ddd; padding:8px;">详细内容</th>
-        <th style="border:1px solid #ddd; padding:8px; width:20%;">默认值</th>
-      </tr>
-    </thead>
-    <tbody>
-    {% for row in rows %}
-      <tr>
-        <td style="border:1px solid #ddd; padding:8px; word-break: break-all;">{{ row.name }}</td>
-        <td style="border:1px solid #ddd; padding:8px; word-break: break-word; white-space: pre-wrap;">{{ row.detail }}</td>
-        <td style="border:1px solid #ddd; padding:8px; word-break: break-all;">{{ row.default }}</td>
-      </tr>
-    {% endfor %}
-    </tbody>
-  </table>
-</div>
-"""
-                    title = f"{metadata.get('name', '插件')} 配置"
-                    url = await self.star.html_render(
-                        CONFIG_TMPL, {"title": title, "rows": rows}
+                    url = await self._html_render_cached(
+                        _CONFIG_TMPL, {"title": f"{name} 配置", "rows": rows}
                     )
-                    await event.send(event.image_result(url))
+                    return event.image_result(url)
                 except Exception:
                     # 回退到文本转图
                     try:
@@ -510,22 +663,51 @@ class PluginGenerator:
                         for r in rows:
                             lines.append(f"{r['name']}  {r['detail']}  {r['default']}")
                         url = await self.star.text_to_image("\n".join(lines))
-                        await event.send(event.image_result(url))
+                        return event.image_result(url)
                     except Exception:
-                        await event.send(
-                            event.plain_result(
-                                "\n".join(
-                                    [json.dumps(schema_obj, ensure_ascii=False)[:1800]]
-                                )
-                            )
+                        return event.plain_result(
+                            json.dumps(schema_obj, ensure_ascii=False)[:1800]
                         )
-            else:
-                # 如果不是有效的JSON，直接转图发送原始文本
-                try:
-                    url = await self.star.text_to_image(cfg_text)
-                    await event.send(event.image_result(url))
-                except Exception:
-                    await event.send(event.plain_result(cfg_text[:1800]))
+            # 如果不是有效的JSON，直接转图发送原始文本
+            try:
+                url = await self.star.text_to_image(cfg_text)
+                return event.image_result(url)
+            except Exception:
+                return event.plain_result(cfg_text[:1800])
+
+        renders = []
+        doc_text = (markdown or "").strip()
+        if doc_text:
+            renders.append(render_doc(doc_text))
+        cfg_text = (config_schema or "").strip()
+        if cfg_text:
+            renders.append(render_config(cfg_text))
+        for result in await asyncio.gather(*renders):
+            await event.send(result)
+
+    async def _resolve_api_install(self, event: AstrMessageEvent) -> bool:
+        """根据安装方式配置决定是否通过API安装
+
+        file 模式始终在本地创建插件；api 与 auto 模式在配置了 installer 和API密码时
+        通过API安装，api 模式缺少API密码时会提示用户并改为本地文件安装。
+
+        Args:
+            event: 消息事件
+
+        Returns:
+            bool: 是否通过API安装
+        """
+        install_method = self.config.get("install_method", "auto")
+        if install_method == "file":
+            return False
+        has_api_password = bool(self.config.get("api_password_md5"))
+        if install_method == "api" and not has_api_password:
+            await event.send(
+                event.plain_result(
+                    "已选择API安装，但未配置API密码(MD5)，将改为本地文件安装"
+                )
+            )
+        return bool(self.installer) and has_api_password
 
     async def generate_plugin_flow(
         self, description: str, event: AstrMessageEvent
@@ -551,34 +733,7 @@ class PluginGenerator:
 
         try:
             # 验证目录结构（根据配置选择安装方式）
-            install_method = self.config.get("install_method", "auto")
-            restore_api_pwd = False
-            saved_api_pwd = None
-            if install_method == "api":
-                use_api_install = True
-                if not self.config.get("api_password_md5"):
-                    await event.send(
-                        event.plain_result(
-                            "已选择API安装，但未配置API密码(MD5)，将改为本地文件安装"
-                        )
-                    )
-                    use_api_install = False
-                    # 确保后续不走API安装分支
-                    saved_api_pwd = self.config.get("api_password_md5")
-                    self.config["api_password_md5"] = ""
-                    restore_api_pwd = True
-            elif install_method == "file":
-                use_api_install = False
-                # 显式选择文件安装，避免误触发API安装
-                saved_api_pwd = self.config.get("api_password_md5")
-                if saved_api_pwd:
-                    self.config["api_password_md5"] = ""
-                    restore_api_pwd = True
-            else:
-                # auto 模式：如果配置了API密码则走API，否则走本地文件
-                use_api_install = bool(
-                    self.installer and self.config.get("api_password_md5")
-                )
+            use_api_install = await self._resolve_api_install(event)
 
             dir_validation = self.directory_detector.validate_directory_structure()
             if not dir_validation["valid"]:
@@ -600,6 +755,7 @@ class PluginGenerator:
             metadata: dict[str, Any] = {}
             markdown_doc = ""
             config_schema = ""
+            bundled_config: str | None = None
 
             max_retries = self.config.get("max_retries", 3)
             unlimited_retry = max_retries == -1
@@ -619,6 +775,8 @@ class PluginGenerator:
                             description
                         )
                         markdown_doc = metadata.get("markdown", "")
+                        # 非分步模式下配置文件随元数据一并生成
+                        bundled_config = metadata.pop("config_schema", None)
                     break
                 except Exception as generate_err:
                     retry_count += 1
@@ -637,114 +795,101 @@ class PluginGenerator:
 
             metadata.setdefault("metadata", {})
             metadata.setdefault("commands", [])
-            plugin_name = sanitize_plugin_name(
+            plugin_name = _canonical_plugin_name(
                 metadata.get("name", "astrbot_plugin_generated")
             )
-            if not plugin_name.startswith("astrbot_plugin_"):
-                plugin_name = f"astrbot_plugin_{plugin_name}"
             metadata["name"] = plugin_name
             self._update_status(1, plugin_name)
 
             # 检查插件是否已存在
-            if self.directory_detector.check_plugin_exists(plugin_name):
+            if await asyncio.to_thread(
+                self.directory_detector.check_plugin_exists, plugin_name
+            ):
                 message = f"插件 '{plugin_name}' 已存在"
                 await event.send(event.plain_result(message))
                 self.logger.warning(message)
                 return {"success": False, "error": message}
 
-            # 步骤2：生成插件文档
+            # 步骤2、3：文档与配置只依赖元数据和用户描述，并发生成以重叠两次LLM调用的等待
             self._update_status(2, plugin_name)
-            retry_count = 0
-            while True:
-                try:
-                    if step_by_step or not markdown_doc:
-                        markdown_doc = (
-                            await self.llm_handler.generate_markdown_document(
-                                metadata, description
-                            )
-                        )
-                    break
-                except Exception as doc_err:
-                    retry_count += 1
-                    if not unlimited_retry and retry_count > max_retries:
-                        error_msg = (
-                            f"生成插件失败（已重试{max_retries}次）：{str(doc_err)}"
+            steps = {}
+            if bundled_config is None:
+                steps["config"] = self._call_with_retry(
+                    max_retries,
+                    self.llm_handler.generate_config_schema,
+                    metadata,
+                    description,
+                )
+            if step_by_step or not markdown_doc:
+                steps["markdown"] = self._call_with_retry(
+                    max_retries,
+                    self.llm_handler.generate_markdown_document,
+                    metadata,
+                    description,
+                )
+            results = dict(zip(steps, await asyncio.gather(*steps.values())))
+            config_schema, config_err = results.get("config", (bundled_config, None))
+            doc_err = None
+            if "markdown" in results:
+                markdown_doc, doc_err = results["markdown"]
+
+            if doc_err is not None:
+                error_msg = f"生成插件失败（已重试{max_retries}次）：{str(doc_err)}"
+                self.logger.error(error_msg)
+                if await self._suspend_task(
+                    step=2,
+                    error_message=error_msg,
+                    retry_count=max_retries + 1,
+                    plugin_name=plugin_name,
+                    description=description,
+                    metadata=metadata,
+                    umo=getattr(event, "unified_msg_origin", ""),
+                ):
+                    await event.send(
+                        event.plain_result(
+                            f"生成文档重试耗尽，任务已挂起。\n使用 /继续生成 {plugin_name} 恢复。"
                         )
-                        self.logger.error(error_msg)
-                        if await self._suspend_task(
-                            step=2,
-                            error_message=error_msg,
-                            retry_count=retry_count,
-                            plugin_name=plugin_name,
-                            description=description,
-                            metadata=metadata,
-                            umo=getattr(event, "unified_msg_origin", ""),
-                        ):
-                            await event.send(
-                                event.plain_result(
-                                    f"生成文档重试耗尽，任务已挂起。\n使用 /继续生成 {plugin_name} 恢复。"
-                                )
-                            )
-                            return {
-                                "success": False,
-                                "error": error_msg,
-                                "suspended": True,
-                            }
-                        else:
-                            await event.send(
-                                event.plain_result(f"任务挂起失败：{error_msg}")
-                            )
-                            return {"success": False, "error": error_msg}
-                    self.logger.warning(
-                        f"生成失败，重试 {retry_count}/{max_retries}：{str(doc_err)}"
                     )
+                    return {
+                        "success": False,
+                        "error": error_msg,
+                        "suspended": True,
+                    }
+                else:
+                    await event.send(event.plain_result(f"任务挂起失败：{error_msg}"))
+                    return {"success": False, "error": error_msg}
             metadata["markdown"] = markdown_doc
 
-            # 步骤3：生成配置文件
             self._update_status(3, plugin_name)
-            retry_count = 0
-            while True:
-                try:
-                    config_schema = await self.llm_handler.generate_config_schema(
-                        metadata, description
-                    )
-                    config_schema = self._normalize_config_schema(config_schema)
-                    break
-                except Exception as config_err:
-                    retry_count += 1
-                    if not unlimited_retry and retry_count > max_retries:
-                        error_msg = (
-                            f"生成插件失败（已重试{max_retries}次）：{str(config_err)}"
+            if config_err is not None:
+                error_msg = (
+                    f"生成插件失败（已重试{max_retries}次）：{str(config_err)}"
+                )
+                self.logger.error(error_msg)
+                if await self._suspend_task(
+                    step=3,
+                    error_message=error_msg,
+                    retry_count=max_retries + 1,
+                    plugin_name=plugin_name,
+                    description=description,
+                    metadata=metadata,
+                    markdown=markdown_doc,
+                    umo=getattr(event, "unified_msg_origin", ""),
+                ):
+                    await event.send(
+                        event.plain_result(
+                            f"生成配置重试耗尽，任务已挂起。\n使用 /继续生成 {plugin_name} 恢复。"
                         )
-                        self.logger.error(error_msg)
-                        if await self._suspend_task(
-                            step=3,
-                            error_message=error_msg,
-                            retry_count=retry_count,
-                            plugin_name=plugin_name,
-                            description=description,
-                            metadata=metadata,
-                            markdown=markdown_doc,
-                            umo=getattr(event, "unified_msg_origin", ""),
-                        ):
-                            await event.send(
-                                event.plain_result(
-                                    f"生成配置重试耗尽，任务已挂起。\n使用 /继续生成 {plugin_name} 恢复。"
-                                )
-                            )
-                            return {
-                                "success": False,
-                                "error": error_msg,
-                                "suspended": True,
-                            }
-                        else:
-                            await event.send(
-                                event.plain_result(f"任务挂起失败：{error_msg}")
-                            )
-                            return {"success": False, "error": error_msg}
-                    self.logger.warning(
-                        f"生成失败，重试 {retry_count}/{max_retries}：{str(config_err)}"
                     )
+                    return {
+                        "success": False,
+                        "error": error_msg,
+                        "suspended": True,
+                    }
+                else:
+                    await event.send(event.plain_result(f"任务挂起失败：{error_msg}"))
+                    return {"success": False, "error": error_msg}
+            config_schema = self._normalize_config_schema(config_schema)
 
             # 显示初步生成的插件方案（仅元数据信息） - 仅在非自动批准模式下显示
             if not self.config.get("auto_approve", False):
@@ -774,7 +919,7 @@ class PluginGenerator:
                     "modification_history": [],
                 }
                 # 持久化待确认任务，防止插件重载导致状态丢失
-                self._save_pending_state()
+                await self._save_pending_state()
 
                 await event.send(
                     event.plain_result(
@@ -844,53 +989,15 @@ class PluginGenerator:
             # 步骤5：代码审查与修复
             self._update_status(5, plugin_name)
             self.logger.info(f"开始代码审查: {plugin_name}")
-            review_result = self._normalize_review_result(
-                await self._review_code_with_retry(code, metadata, markdown_doc)
+            (
+                review_passed,
+                code,
+                review_result,
+                retry_count,
+            ) = await self._ensure_code_review_passed(
+                code, metadata, markdown_doc, event
             )
-            satisfaction_threshold = self._get_satisfaction_threshold()
-            strict_review = self.config.get("strict_review", True)
-            max_retries = self.config.get("max_retries", 3)
-            unlimited_retry = max_retries == -1
-            retry_count = 0
-
-            while (
-                (review_result["satisfaction_score"] < satisfaction_threshold)
-                or (not review_result["approved"])
-            ) and (unlimited_retry or retry_count < max_retries):
-                retry_count += 1
-                if strict_review and not review_result["approved"]:
-                    await event.send(
-                        event.plain_result(
-                            f"代码审查未通过，正在修复（第{retry_count}次重试）..."
-                        )
-                    )
-                else:
-                    await event.send(
-                        event.plain_result(
-                            f"代码满意度不足（{review_result['satisfaction_score']}分），正在优化（第{retry_count}次重试）..."
-                        )
-                    )
-                (
-                    new_code,
-                    diff_errors,
-                ) = await self.llm_handler.fix_plugin_code_with_diff(
-                    code, review_result["issues"], review_result["suggestions"]
-                )
-                if diff_errors:
-                    # 差分修复失败：保留原 code，把错误信息带入下一轮审查，
-                    # 让 LLM 在生成 SEARCH 块时看到更具体的上下文
-                    self.logger.warning(f"差分修复未应用任何变更：{diff_errors}")
-                else:
-                    code = new_code
-                review_result = self._normalize_review_result(
-                    await self.llm_handler.review_plugin_code(
-                        code, metadata, markdown_doc
-                    )
-                )
-
-            if (review_result["satisfaction_score"] < satisfaction_threshold) or (
-                not review_result["approved"]
-            ):
+            if not review_passed:
                 reason = review_result.get("reason", "代码审查未通过")
                 error_msg = f"代码审查未通过：{reason}"
                 if await self._suspend_task(
@@ -930,14 +1037,13 @@ class PluginGenerator:
             }
 
             # 尝试通过API安装插件
-            if self.installer and self.config.get("api_password_md5"):
+            if use_api_install:
                 install_result = await self._install_with_auto_retry(
                     plugin_name, metadata, code, markdown_doc, config_schema, event
                 )
 
                 result["installed"] = install_result.get("installed", False)
                 result["install_success"] = install_result.get("install_success", False)
-                result["plugin_path"] = install_result.get("plugin_path", "")
 
                 if install_result.get("install_success"):
                     if install_result.get("has_runtime_errors"):
@@ -1003,50 +1109,29 @@ class PluginGenerator:
             self.logger.error(f"插件生成流程失败：{str(e)}")
             return {"success": False, "error": str(e)}
         finally:
-            # 恢复API密码配置（如有临时修改）
-            try:
-                if restore_api_pwd:
-                    self.config["api_password_md5"] = saved_api_pwd
-            except Exception:
-                pass
             self.generation_status["is_generating"] = False
             self.generation_status["current_step"] = 0
             self.generation_status["progress_percentage"] = 0
             self.generation_status["plugin_name"] = ""
 
-    def get_pending_generation(self) -> dict[str, Any]:
-        """获取待确认的插件生成任务
+    async def has_pending_generation(self) -> bool:
+        """是否存在待确认的插件生成任务
+
+        内存中已有活动任务时直接返回，无需复制状态字典；
+        否则在线程中重新读取状态文件，以恢复初始化时未能加载的任务。
 
         Returns:
-            Dict[str, Any]: 待确认任务信息
+            bool: 是否存在待确认任务
         """
-        # 如内存中不存在，尝试从文件恢复
         if not self.pending_generation.get("active"):
-            try:
-                self._load_pending_state()
-            except Exception:
-                pass
-        return self.pending_generation.copy()
+            await self._reload_pending_state()
+        return bool(self.pending_generation.get("active"))
 
     def clear_pending_generation(self):
         """清除待确认的插件生成任务"""
         # 删除持久化的状态文件
-        try:
-            self._delete_pending_state()
-        except Exception:
-            pass
-        self.pending_generation = {
-            "active": False,
-            "metadata": {},
-            "markdown": "",
-            "config_schema": "",
-            "description": "",
-            "event": None,
-            "umo": "",
-            "timestamp": "",
-            "awaiting_confirmation": False,
-            "modification_history": [],
-        }
+        self._delete_pending_state()
+        self.pending_generation = _empty_pending_generation()
 
     async def continue_plugin_generation(
         self,
@@ -1066,10 +1151,7 @@ class PluginGenerator:
         """
         if not self.pending_generation["active"]:
             # 尝试从文件恢复
-            try:
-                self._load_pending_state()
-            except Exception:
-                pass
+            await self._reload_pending_state()
         if not self.pending_generation["active"]:
             return {"success": False, "error": "没有待确认的插件生成任务"}
 
@@ -1104,14 +1186,21 @@ class PluginGenerator:
                     metadata.setdefault("metadata", {})
                     metadata.setdefault("commands", [])
                     markdown_doc = metadata.get("markdown", markdown_doc)
-                    plugin_name = sanitize_plugin_name(
-                        metadata.get("name", metadata.get("name", "generated_plugin"))
+                    plugin_name = _canonical_plugin_name(
+                        metadata.get("name", "generated_plugin")
                     )
-                    if not plugin_name.startswith("astrbot_plugin_"):
-                        plugin_name = f"astrbot_plugin_{plugin_name}"
                     metadata["name"] = plugin_name
                     metadata["markdown"] = markdown_doc
 
+                    # 检查插件是否已存在（先于配置生成，已存在时无需再请求LLM）
+                    if await asyncio.to_thread(
+                        self.directory_detector.check_plugin_exists, plugin_name
+                    ):
+                        message = f"插件 '{plugin_name}' 已存在"
+                        await event.send(event.plain_result(message))
+                        self.logger.warning(message)
+                        return {"success": False, "error": message}
+
                     combined_description = description
                     if feedback:
                         combined_description = f"{description}\n\n用户反馈：{feedback}"
@@ -1119,13 +1208,6 @@ class PluginGenerator:
                         metadata, combined_description
                     )
 
-                    # 检查插件是否已存在
-                    if self.directory_detector.check_plugin_exists(plugin_name):
-                        message = f"插件 '{plugin_name}' 已存在"
-                        await event.send(event.plain_result(message))
-                        self.logger.warning(message)
-                        return {"success": False, "error": message}
-
                     # 显示优化后的方案（仅元数据信息）
                     await event.send(
                         event.plain_result(
@@ -1154,32 +1236,14 @@ class PluginGenerator:
             self.generation_status["is_generating"] = True
             self.generation_status["start_time"] = format_time(time.time())
 
-            plugin_name = sanitize_plugin_name(
+            plugin_name = _canonical_plugin_name(
                 metadata.get("name", "astrbot_plugin_generated")
             )
-            if not plugin_name.startswith("astrbot_plugin_"):
-                plugin_name = f"astrbot_plugin_{plugin_name}"
             metadata["name"] = plugin_name
             self._update_status(4, plugin_name)
 
-            # 根据配置选择安装方式（可能临时禁用API安装）
-            install_method = self.config.get("install_method", "auto")
-            restore_api_pwd2 = False
-            saved_api_pwd2 = None
-            if install_method == "file":
-                saved_api_pwd2 = self.config.get("api_password_md5")
-                if saved_api_pwd2:
-                    self.config["api_password_md5"] = ""
-                    restore_api_pwd2 = True
-            elif install_method == "api" and not self.config.get("api_password_md5"):
-                await event.send(
-                    event.plain_result(
-                        "已选择API安装，但未配置API密码(MD5)，将改为本地文件安装"
-                    )
-                )
-                saved_api_pwd2 = self.config.get("api_password_md5")
-                self.config["api_password_md5"] = ""
-                restore_api_pwd2 = True
+            # 根据配置选择安装方式
+            use_api_install = await self._resolve_api_install(event)
 
             # 步骤4：生成插件代码
             self.logger.info(f"开始生成插件代码: {plugin_name}")
@@ -1237,53 +1301,15 @@ class PluginGenerator:
             self._update_status(5, plugin_name)
             self.logger.info(f"开始代码审查: {plugin_name}")
 
-            review_result = self._normalize_review_result(
-                await self._review_code_with_retry(code, metadata, markdown_doc)
+            (
+                review_passed,
+                code,
+                review_result,
+                retry_count,
+            ) = await self._ensure_code_review_passed(
+                code, metadata, markdown_doc, event
             )
-            satisfaction_threshold = self._get_satisfaction_threshold()
-            strict_review = self.config.get("strict_review", True)
-            max_retries = self.config.get("max_retries", 3)
-            unlimited_retry = max_retries == -1
-            retry_count = 0
-
-            while (
-                (review_result["satisfaction_score"] < satisfaction_threshold)
-                or (not review_result["approved"])
-            ) and (unlimited_retry or retry_count < max_retries):
-                retry_count += 1
-                if strict_review and not review_result["approved"]:
-                    await event.send(
-                        event.plain_result(
-                            f"代码审查未通过，正在修复（第{retry_count}次重试）..."
-                        )
-                    )
-                else:
-                    await event.send(
-                        event.plain_result(
-                            f"代码满意度不足（{review_result['satisfaction_score']}分），正在优化（第{retry_count}次重试）..."
-                        )
-                    )
-                (
-                    new_code,
-                    diff_errors,
-                ) = await self.llm_handler.fix_plugin_code_with_diff(
-                    code, review_result["issues"], review_result["suggestions"]
-                )
-                if diff_errors:
-                    # 差分修复失败：保留原 code，把错误信息带入下一轮审查，
-                    # 让 LLM 在生成 SEARCH 块时看到更具体的上下文
-                    self.logger.warning(f"差分修复未应用任何变更：{diff_errors}")
-                else:
-                    code = new_code
-                review_result = self._normalize_review_result(
-                    await self.llm_handler.review_plugin_code(
-                        code, metadata, markdown_doc
-                    )
-                )
-
-            if (review_result["satisfaction_score"] < satisfaction_threshold) or (
-                not review_result["approved"]
-            ):
+            if not review_passed:
                 reason = review_result.get("reason", "代码审查未通过")
                 error_msg = f"代码审查未通过：{reason}"
                 if await self._suspend_task(
@@ -1323,14 +1349,13 @@ class PluginGenerator:
             }
 
             # 尝试通过API安装插件
-            if self.installer and self.config.get("api_password_md5"):
+            if use_api_install:
                 install_result = await self._install_with_auto_retry(
                     plugin_name, metadata, code, markdown_doc, config_schema, event
                 )
 
                 result["installed"] = install_result.get("installed", False)
                 result["install_success"] = install_result.get("install_success", False)
-                result["plugin_path"] = install_result.get("plugin_path", "")
 
                 if install_result.get("install_success"):
                     if install_result.get("has_runtime_errors"):
@@ -1396,12 +1421,6 @@ class PluginGenerator:
             self.logger.error(f"插件生成流程失败：{str(e)}")
             return {"success": False, "error": str(e)}
         finally:
-            # 恢复API密码配置（如有临时修改）
-            try:
-                if restore_api_pwd2:
-                    self.config["api_password_md5"] = saved_api_pwd2
-            except Exception:
-                pass
             self.generation_status["is_generating"] = False
             self.generation_status["current_step"] = 0
             self.generation_status["progress_percentage"] = 0
@@ -1427,112 +1446,106 @@ class PluginGenerator:
             return {"success": False, "error": f"未找到挂起的任务：{task_key}"}
 
         step = task.get("failed_step", 2)
-        if step < 2:
-            await self._delete_suspended(task_key)
-            return {
-                "success": False,
-                "error": f"任务 {task_key} 在第一阶段生成失败，无法恢复。请使用 /生成插件 重新开始。",
-            }
-
-        description = task.get("description", "")
-        metadata = task.get("metadata", {})
-        markdown_doc = task.get("markdown", "")
-        config_schema = task.get("config_schema", "")
-        code = task.get("code", "")
-        saved_retry_count = task.get("retry_count", 0)
-        plugin_name = task.get("plugin_name", task_key)
-
-        self.generation_status["is_generating"] = True
-        self.generation_status["start_time"] = format_time(time.time())
-        restore_api_pwd = False
-        saved_api_pwd = None
-
-        try:
-            step_by_step = self.config.get("step_by_step", True)
-            max_retries = self.config.get("max_retries", 3)
-            unlimited_retry = max_retries == -1
-
-            # --- Step 2 ---
-            if step <= 2:
-                self._update_status(2, plugin_name)
-                retry_count = 0
-                while True:
-                    try:
-                        if step_by_step or not markdown_doc:
-                            markdown_doc = (
-                                await self.llm_handler.generate_markdown_document(
-                                    metadata, description
-                                )
-                            )
-                        break
-                    except Exception as e:
-                        retry_count += 1
-                        if not unlimited_retry and retry_count > max_retries:
-                            error_msg = f"恢复失败（已重试{max_retries}次）：{str(e)}"
-                            self.logger.error(error_msg)
-                            if await self._suspend_task(
-                                step=2,
-                                error_message=error_msg,
-                                retry_count=retry_count,
-                                plugin_name=plugin_name,
-                                description=description,
-                                metadata=metadata,
-                                umo=getattr(event, "unified_msg_origin", ""),
-                            ):
-                                return {
-                                    "success": False,
-                                    "error": error_msg,
-                                    "suspended": True,
-                                }
-                            else:
-                                await event.send(
-                                    event.plain_result(f"任务挂起失败：{error_msg}")
-                                )
-                                return {"success": False, "error": error_msg}
-                        self.logger.warning(
-                            f"恢复失败，重试 {retry_count}/{max_retries}：{str(e)}"
-                        )
-                metadata["markdown"] = markdown_doc
+        if step < 2:
+            await self._delete_suspended(task_key)
+            return {
+                "success": False,
+                "error": f"任务 {task_key} 在第一阶段生成失败，无法恢复。请使用 /生成插件 重新开始。",
+            }
+
+        description = task.get("description", "")
+        metadata = task.get("metadata", {})
+        markdown_doc = task.get("markdown", "")
+        config_schema = task.get("config_schema", "")
+        code = task.get("code", "")
+        saved_retry_count = task.get("retry_count", 0)
+        plugin_name = task.get("plugin_name", task_key)
+
+        self.generation_status["is_generating"] = True
+        self.generation_status["start_time"] = format_time(time.time())
+
+        try:
+            step_by_step = self.config.get("step_by_step", True)
+            max_retries = self.config.get("max_retries", 3)
+            unlimited_retry = max_retries == -1
 
-            # --- Step 3 ---
+            # --- Step 2 & 3 ---
+            # 文档与配置只依赖元数据和用户描述，并发生成以重叠两次LLM调用的等待
             if step <= 3:
-                self._update_status(3, plugin_name)
-                retry_count = 0
-                while True:
-                    try:
-                        config_schema = await self.llm_handler.generate_config_schema(
-                            metadata, description
+                self._update_status(step, plugin_name)
+                steps = {
+                    "config": self._call_with_retry(
+                        max_retries,
+                        self.llm_handler.generate_config_schema,
+                        metadata,
+                        description,
+                    )
+                }
+                if step <= 2 and (step_by_step or not markdown_doc):
+                    steps["markdown"] = self._call_with_retry(
+                        max_retries,
+                        self.llm_handler.generate_markdown_document,
+                        metadata,
+                        description,
+                    )
+                results = dict(zip(steps, await asyncio.gather(*steps.values())))
+
+                doc_err = None
+                if "markdown" in results:
+                    markdown_doc, doc_err = results["markdown"]
+                if doc_err is not None:
+                    error_msg = f"恢复失败（已重试{max_retries}次）：{str(doc_err)}"
+                    self.logger.error(error_msg)
+                    if await self._suspend_task(
+                        step=2,
+                        error_message=error_msg,
+                        retry_count=max_retries + 1,
+                        plugin_name=plugin_name,
+                        description=description,
+                        metadata=metadata,
+                        umo=getattr(event, "unified_msg_origin", ""),
+                    ):
+                        return {
+                            "success": False,
+                            "error": error_msg,
+                            "suspended": True,
+                        }
+                    else:
+                        await event.send(
+                            event.plain_result(f"任务挂起失败：{error_msg}")
                         )
-                        config_schema = self._normalize_config_schema(config_schema)
-                        break
-                    except Exception as e:
-                        retry_count += 1
-                        if not unlimited_retry and retry_count > max_retries:
-                            error_msg = f"恢复失败（已重试{max_retries}次）：{str(e)}"
-                            self.logger.error(error_msg)
-                            if await self._suspend_task(
-                                step=3,
-                                error_message=error_msg,
-                                retry_count=retry_count,
-                                plugin_name=plugin_name,
-                                description=description,
-                                metadata=metadata,
-                                markdown=markdown_doc,
-                                umo=getattr(event, "unified_msg_origin", ""),
-                            ):
-                                return {
-                                    "success": False,
-                                    "error": error_msg,
-                                    "suspended": True,
-                                }
-                            else:
-                                await event.send(
-                                    event.plain_result(f"任务挂起失败：{error_msg}")
-                                )
-                                return {"success": False, "error": error_msg}
-                        self.logger.warning(
-                            f"恢复失败，重试 {retry_count}/{max_retries}：{str(e)}"
+                        return {"success": False, "error": error_msg}
+                if step <= 2:
+                    metadata["markdown"] = markdown_doc
+
+                self._update_status(3, plugin_name)
+                config_schema, config_err = results["config"]
+                if config_err is not None:
+                    error_msg = (
+                        f"恢复失败（已重试{max_retries}次）：{str(config_err)}"
+                    )
+                    self.logger.error(error_msg)
+                    if await self._suspend_task(
+                        step=3,
+                        error_message=error_msg,
+                        retry_count=max_retries + 1,
+                        plugin_name=plugin_name,
+                        description=description,
+                        metadata=metadata,
+                        markdown=markdown_doc,
+                        umo=getattr(event, "unified_msg_origin", ""),
+                    ):
+                        return {
+                            "success": False,
+                            "error": error_msg,
+                            "suspended": True,
+                        }
+                    else:
+                        await event.send(
+                            event.plain_result(f"任务挂起失败：{error_msg}")
                         )
+                        return {"success": False, "error": error_msg}
+                config_schema = self._normalize_config_schema(config_schema)
 
             # Steps 1-3 completed — check user confirmation for non-auto-approve
             if step <= 3 and not self.config.get("auto_approve", False):
@@ -1556,7 +1569,7 @@ class PluginGenerator:
                     "awaiting_confirmation": True,
                     "modification_history": [],
                 }
-                self._save_pending_state()
+                await self._save_pending_state()
                 await self._delete_suspended(task_key)
                 await event.send(
                     event.plain_result(
@@ -1609,53 +1622,19 @@ class PluginGenerator:
             if step <= 5:
                 self._update_status(5, plugin_name)
 
-                review_result = self._normalize_review_result(
-                    await self._review_code_with_retry(code, metadata, markdown_doc)
-                )
-                satisfaction_threshold = self._get_satisfaction_threshold()
-                strict_review = self.config.get("strict_review", True)
-                max_retries = self.config.get("max_retries", 3)
-                unlimited_retry = max_retries == -1
-                retry_count = saved_retry_count if step == 5 else 0
-
-                while (
-                    (review_result["satisfaction_score"] < satisfaction_threshold)
-                    or (not review_result["approved"])
-                ) and (unlimited_retry or retry_count < max_retries):
-                    retry_count += 1
-                    if strict_review and not review_result["approved"]:
-                        await event.send(
-                            event.plain_result(
-                                f"代码审查未通过，正在修复（第{retry_count}次重试）..."
-                            )
-                        )
-                    else:
-                        await event.send(
-                            event.plain_result(
-                                f"代码满意度不足（{review_result['satisfaction_score']}分），正在优化（第{retry_count}次重试）..."
-                            )
-                        )
                 (
-                    new_code,
-                    diff_errors,
-                ) = await self.llm_handler.fix_plugin_code_with_diff(
-                    code, review_result["issues"], review_result["suggestions"]
+                    review_passed,
+                    code,
+                    review_result,
+                    retry_count,
+                ) = await self._ensure_code_review_passed(
+                    code,
+                    metadata,
+                    markdown_doc,
+                    event,
+                    retry_count=saved_retry_count if step == 5 else 0,
                 )
-                if diff_errors:
-                    # 差分修复失败：保留原 code，把错误信息带入下一轮审查，
-                    # 让 LLM 在生成 SEARCH 块时看到更具体的上下文
-                    self.logger.warning(f"差分修复未应用任何变更：{diff_errors}")
-                else:
-                    code = new_code
-                    review_result = self._normalize_review_result(
-                        await self.llm_handler.review_plugin_code(
-                            code, metadata, markdown_doc
-                        )
-                    )
-
-                if (review_result["satisfaction_score"] < satisfaction_threshold) or (
-                    not review_result["approved"]
-                ):
+                if not review_passed:
                     reason = review_result.get("reason", "代码审查未通过")
                     error_msg = f"代码审查未通过：{reason}"
                     if await self._suspend_task(
@@ -1686,12 +1665,7 @@ class PluginGenerator:
             # --- Step 6 ---
             self._update_status(6, plugin_name)
 
-            install_method = self.config.get("install_method", "auto")
-            if install_method == "file":
-                saved_api_pwd = self.config.get("api_password_md5")
-                if saved_api_pwd:
-                    self.config["api_password_md5"] = ""
-                    restore_api_pwd = True
+            use_api_install = await self._resolve_api_install(event)
 
             result = {
                 "success": True,
@@ -1703,14 +1677,13 @@ class PluginGenerator:
                 "installed": False,
             }
 
-            if self.installer and self.config.get("api_password_md5"):
+            if use_api_install:
                 install_result = await self._install_with_auto_retry(
                     plugin_name, metadata, code, markdown_doc, config_schema, event
                 )
 
                 result["installed"] = install_result.get("installed", False)
                 result["install_success"] = install_result.get("install_success", False)
-                result["plugin_path"] = install_result.get("plugin_path", "")
 
                 if install_result.get("install_success"):
                     if install_result.get("has_runtime_errors"):
@@ -1775,11 +1748,6 @@ class PluginGenerator:
             self.logger.error(f"恢复挂起任务失败：{str(e)}")
             return {"success": False, "error": str(e)}
         finally:
-            try:
-                if restore_api_pwd:
-                    self.config["api_password_md5"] = saved_api_pwd
-            except Exception:
-                pass
             self.generation_status["is_generating"] = False
             self.generation_status["current_step"] = 0
             self.generation_status["progress_percentage"] = 0
@@ -1807,36 +1775,28 @@ class PluginGenerator:
         Returns:
             Dict[str, Any]: 安装结果
         """
-        import shutil
-        import tempfile
-
         max_retries = self.installer.max_retries
         current_retry = 0
         current_code = code
+        folder_name = plugin_folder_name(plugin_name)
 
         while max_retries == -1 or current_retry <= max_retries:
-            temp_dir = tempfile.mkdtemp(prefix="codemage_plugin_")
-            zip_path = None
-
             try:
-                # 1. 创建插件文件
-                plugin_path = await self._create_plugin_files(
-                    plugin_name,
-                    metadata,
-                    current_code,
-                    markdown,
-                    config_schema,
-                    base_dir=temp_dir,
+                # 1-2. 生成插件文件并直接在内存中打包，无需写入临时目录
+                files = self._build_plugin_files(
+                    plugin_name, metadata, current_code, markdown, config_schema
                 )
+                try:
+                    zip_bytes = self.installer.create_plugin_zip_bytes(
+                        folder_name, files
+                    )
+                except Exception as e:
+                    self.logger.error(f"插件打包失败: {str(e)}")
+                    return {"success": False, "error": "插件打包失败"}
                 self.logger.info(
-                    f"插件已在临时目录生成 (尝试 {current_retry + 1}/{max_retries + 1}): {plugin_name}"
+                    f"插件已打包 (尝试 {current_retry + 1}/{max_retries + 1}): {plugin_name}"
                 )
 
-                # 2. 打包插件
-                zip_path = await self.installer.create_plugin_zip(plugin_path)
-                if not zip_path:
-                    return {"success": False, "error": "插件打包失败"}
-
                 # 3. 安装前记录时间戳，用于后续日志时间窗过滤
                 self.installer.set_install_timestamp()
 
@@ -1849,7 +1809,9 @@ class PluginGenerator:
                 else:
                     await event.send(event.plain_result("正在通过API安装插件..."))
 
-                install_result = await self.installer.install_plugin(zip_path)
+                install_result = await self.installer.install_plugin_bytes(
+                    zip_bytes, folder_name
+                )
 
                 if not install_result.get("success"):
                     # 安装请求本身失败（如网络问题、认证失败等），通常不需要修复代码，直接返回失败
@@ -1869,7 +1831,6 @@ class PluginGenerator:
                     self.logger.info(f"✅ 插件安装成功且运行正常: {plugin_name}")
                     return {
                         "success": True,
-                        "plugin_path": plugin_path,  # 注意：这里返回的是临时路径，但对于API安装来说不重要
                         "installed": True,
                         "install_success": True,
                     }
@@ -1890,7 +1851,6 @@ class PluginGenerator:
                     )
                     return {
                         "success": True,
-                        "plugin_path": plugin_path,
                         "installed": True,
                         "install_success": True,
                         "has_runtime_errors": True,
@@ -1931,21 +1891,154 @@ class PluginGenerator:
             except Exception as e:
                 self.logger.error(f"自动修复流程异常: {str(e)}")
                 return {"success": False, "error": f"自动修复流程异常: {str(e)}"}
-            finally:
-                # 清理临时文件
-                if zip_path and os.path.exists(zip_path):
-                    try:
-                        os.remove(zip_path)
-                    except Exception:
-                        pass
-                if os.path.exists(temp_dir):
-                    try:
-                        shutil.rmtree(temp_dir)
-                    except Exception:
-                        pass
 
         return {"success": False, "error": "未知错误"}
 
+    async def _ensure_code_review_passed(
+        self,
+        code: str,
+        metadata: dict[str, Any],
+        markdown_doc: str,
+        event: AstrMessageEvent,
+        retry_count: int = 0,
+    ) -> tuple[bool, str, dict[str, Any], int]:
+        """审查插件代码，未通过时循环修复并复审，直到通过或重试次数耗尽
+
+        元数据与文档在整个循环中保持不变；相同代码的审查请求由 LLMHandler 的
+        结果缓存直接返回（例如差分修复未改动代码时的复审），修复请求每次都会重新生成。
+
+        Args:
+            code: 插件代码
+            metadata: 插件元数据
+            markdown_doc: 插件Markdown文档
+            event: 消息事件，用于发送修复进度
+            retry_count: 已使用的重试次数（恢复挂起任务时沿用）
+
+        Returns:
+            Tuple[bool, str, Dict[str, Any], int]: (是否通过, 最终代码, 最终审查结果, 已使用的重试次数)
+        """
+        satisfaction_threshold = self._get_satisfaction_threshold()
+        strict_review = self.config.get("strict_review", True)
+        parallel_fix = self.config.get("parallel_fix", False)
+        max_retries = self.config.get("max_retries", 3)
+        unlimited_retry = max_retries == -1
+
+        def is_passed(result: dict[str, Any]) -> bool:
+            return (
+                result["approved"]
+                and result["satisfaction_score"] >= satisfaction_threshold
+            )
+
+        review_result = self._normalize_review_result(
+            await self._review_code_with_retry(code, metadata, markdown_doc)
+        )
+        while not is_passed(review_result) and (
+            unlimited_retry or retry_count < max_retries
+        ):
+            retry_count += 1
+            if strict_review and not review_result["approved"]:
+                await event.send(
+                    event.plain_result(
+                        f"代码审查未通过，正在修复（第{retry_count}次重试）..."
+                    )
+                )
+            else:
+                await event.send(
+                    event.plain_result(
+                        f"代码满意度不足（{review_result['satisfaction_score']}分），正在优化（第{retry_count}次重试）..."
+                    )
+                )
+            if parallel_fix:
+                code, review_result = await self._parallel_fix_round(
+                    code, review_result, metadata, markdown_doc, is_passed
+                )
+                continue
+            new_code, diff_errors = await self.llm_handler.fix_plugin_code_with_diff(
+                code, review_result["issues"], review_result["suggestions"]
+            )
+            if diff_errors:
+                # 差分修复失败：保留原 code，把错误信息带入下一轮审查，
+                # 让 LLM 在生成 SEARCH 块时看到更具体的上下文
+                self.logger.warning(f"差分修复未应用任何变更：{diff_errors}")
+            else:
+                code = new_code
+            review_result = self._normalize_review_result(
+                await self._review_code_with_retry(code, metadata, markdown_doc)
+            )
+
+        return is_passed(review_result), code, review_result, retry_count
+
+    async def _parallel_fix_round(
+        self,
+        code: str,
+        review_result: dict[str, Any],
+        metadata: dict[str, Any],
+        markdown_doc: str,
+        is_passed,
+    ) -> tuple[str, dict[str, Any]]:
+        """并行执行一轮修复：差分修复与整体重写同时进行，并各自复审
+
+        任一方案通过审查即采用并取消另一方案；都未通过时采用得分较高的方案。
+
+        Args:
+            code: 当前插件代码
+            review_result: 当前审查结果
+            metadata: 插件元数据
+            markdown_doc: 插件Markdown文档
+            is_passed: 判断审查结果是否通过的函数
+
+        Returns:
+            Tuple[str, Dict[str, Any]]: (采用的代码, 对应的审查结果)，两种方案都失败时返回原代码与原审查结果
+        """
+        issues = review_result["issues"]
+        suggestions = review_result["suggestions"]
+
+        async def diff_fix() -> str:
+            new_code, diff_errors = await self.llm_handler.fix_plugin_code_with_diff(
+                code, issues, suggestions
+            )
+            if diff_errors:
+                raise ValueError(f"差分修复未应用任何变更：{diff_errors}")
+            return new_code
+
+        async def full_fix() -> str:
+            # 只请求一次整体重写，使每轮调用量与差分修复方案持平
+            return await self.llm_handler.fix_plugin_code(
+                code, issues, suggestions, max_retries=1
+            )
+
+        async def fix_and_review(fix) -> tuple[str, dict[str, Any]]:
+            new_code = await fix()
+            return new_code, self._normalize_review_result(
+                await self._review_code_with_retry(new_code, metadata, markdown_doc)
+            )
+
+        tasks = [
+            asyncio.create_task(fix_and_review(fix)) for fix in (diff_fix, full_fix)
+        ]
+        best: tuple[str, dict[str, Any]] | None = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    candidate = await next_done
+                except Exception as e:
+                    self.logger.warning(f"并行修复方案失败：{str(e)}")
+                    continue
+                if is_passed(candidate[1]):
+                    return candidate
+                if (
+                    best is None
+                    or candidate[1]["satisfaction_score"]
+                    > best[1]["satisfaction_score"]
+                ):
+                    best = candidate
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return best if best is not None else (code, review_result)
+
     async def _review_code_with_retry(
         self, code: str, metadata: dict[str, Any], markdown: str, max_retries: int = 3
     ) -> dict[str, Any]:
@@ -1987,16 +2080,15 @@ class PluginGenerator:
             "suggestions": ["请检查代码并重试"],
         }
 
-    async def _create_plugin_files(
+    def _build_plugin_files(
         self,
         plugin_name: str,
         metadata: dict[str, Any],
         code: str,
         markdown: str,
         config_schema: str = "",
-        base_dir: str | None = None,
-    ) -> str:
-        """创建插件文件
+    ) -> dict[str, str]:
+        """生成插件各文件的内容
 
         Args:
             plugin_name: 插件名称
@@ -2004,86 +2096,113 @@ class PluginGenerator:
             code: 插件代码
             markdown: Markdown文档
             config_schema: 配置文件内容
-            base_dir: 基础目录路径（可选）。如果提供，则在此目录下创建，否则在plugins目录创建
 
         Returns:
-            str: 插件路径
+            Dict[str, str]: 文件名到文件内容的映射
         """
-        # 获取插件目录
-        if base_dir:
-            plugins_dir = base_dir
-        else:
-            plugins_dir = self.directory_detector.get_plugins_directory()
-            if not plugins_dir:
-                raise ValueError("无法获取插件目录")
-
-        # 创建插件目录
-        plugin_dir = create_plugin_directory(plugins_dir, plugin_name)
-
-        # 创建main.py
-        main_py_path = os.path.join(plugin_dir, "main.py")
-        with open(main_py_path, "w", encoding="utf-8") as f:
-            f.write(code)
+        files = {"main.py": code}
 
-        # 创建metadata.yaml
-        metadata_yaml_path = os.path.join(plugin_dir, "metadata.yaml")
+        # metadata.yaml
         metadata_content = (
             metadata.get("metadata", {})
             if isinstance(metadata.get("metadata"), dict)
             else {}
         )
-        yaml_content = f"name: {metadata.get('name', plugin_name)}\n"
-        yaml_content += f"author: {metadata.get('author', 'CodeMage')}\n"
-        yaml_content += (
+        files["metadata.yaml"] = (
+            f"name: {metadata.get('name', plugin_name)}\n"
+            f"author: {metadata.get('author', 'CodeMage')}\n"
             f"description: {metadata.get('description', '由CodeMage生成的插件')}\n"
+            f"version: {metadata.get('version', '1.0.0')}\n"
+            f"repo: {metadata_content.get('repo_url', '')}\n"
         )
-        yaml_content += f"version: {metadata.get('version', '1.0.0')}\n"
-        yaml_content += f"repo: {metadata_content.get('repo_url', '')}\n"
-        with open(metadata_yaml_path, "w", encoding="utf-8") as f:
-            f.write(yaml_content)
 
-        # 创建requirements.txt（如果有依赖）
+        # requirements.txt（如果有依赖）
         dependencies = (
             metadata_content.get("dependencies", [])
             if isinstance(metadata_content, dict)
             else []
         )
         if dependencies and self.config.get("allow_dependencies", True):
-            requirements_path = os.path.join(plugin_dir, "requirements.txt")
-            with open(requirements_path, "w", encoding="utf-8") as f:
-                f.write("\n".join(dependencies))
-            self.logger.info(
-                f"已创建requirements.txt文件，包含{len(dependencies)}个依赖"
-            )
-        else:
-            self.logger.info("未创建requirements.txt文件（无依赖或依赖生成被禁用）")
+            files["requirements.txt"] = "\n".join(dependencies)
 
-        # 创建README.md
-        readme_path = os.path.join(plugin_dir, "README.md")
-        readme_content = (
+        # README.md
+        files["README.md"] = (
             markdown
             if markdown.strip()
             else f"# {metadata.get('name', plugin_name)}\n\n由CodeMage生成的插件"
         )
-        with open(readme_path, "w", encoding="utf-8") as f:
-            f.write(readme_content)
 
-        # 创建_conf_schema.json（如果有配置）
+        # _conf_schema.json（如果有配置）
+        # 流程中的配置通常已经过 _normalize_config_schema 规范化，无需再解析与序列化
         if config_schema and config_schema.strip():
-            config_path = os.path.join(plugin_dir, "_conf_schema.json")
-            try:
-                parsed_config = json.loads(config_schema)
-                formatted_config = json.dumps(
-                    parsed_config, ensure_ascii=False, indent=2
+            files["_conf_schema.json"] = self._normalize_config_schema(config_schema)
+
+        return files
+
+    async def _create_plugin_files(
+        self,
+        plugin_name: str,
+        metadata: dict[str, Any],
+        code: str,
+        markdown: str,
+        config_schema: str = "",
+    ) -> str:
+        """创建插件文件
+
+        Args:
+            plugin_name: 插件名称
+            metadata: 插件元数据
+            code: 插件代码
+            markdown: Markdown文档
+            config_schema: 配置文件内容
+
+        Returns:
+            str: 插件路径
+        """
+        # 获取插件目录
+        plugins_dir = self.directory_detector.get_plugins_directory()
+        if not plugins_dir:
+            raise ValueError("无法获取插件目录")
+
+        # 创建插件目录
+        plugin_dir = await asyncio.to_thread(
+            create_plugin_directory, plugins_dir, plugin_name
+        )
+
+        files = self._build_plugin_files(
+            plugin_name, metadata, code, markdown, config_schema
+        )
+        # 各文件相互独立，在线程中并发写入，避免阻塞事件循环
+        await asyncio.gather(
+            *(
+                asyncio.to_thread(
+                    self._write_text_file, os.path.join(plugin_dir, name), content
                 )
-            except json.JSONDecodeError:
-                formatted_config = config_schema
-            with open(config_path, "w", encoding="utf-8") as f:
-                f.write(formatted_config)
+                for name, content in files.items()
+            )
+        )
+
+        if "requirements.txt" in files:
+            dependency_count = len(files["requirements.txt"].splitlines())
+            self.logger.info(f"已创建requirements.txt文件，包含{dependency_count}个依赖")
+        else:
+            self.logger.info("未创建requirements.txt文件（无依赖或依赖生成被禁用）")
+        if "_conf_schema.json" in files:
             self.logger.info("已创建_conf_schema.json配置文件")
 
         return plugin_dir
 
+    @staticmethod
+    def _write_text_file(path: str, content: str):
+        """以UTF-8写入文本文件
+
+        Args:
+            path: 文件路径
+            content: 文件内容
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
     async def modify_plugin_content(
         self,
         modification_type: str,
@@ -2100,10 +2219,7 @@ class PluginGenerator:
             Dict[str, Any]: 修改结果
         """
         if not self.pending_generation["active"]:
-            try:
-                self._load_pending_state()
-            except Exception:
-                pass
+            await self._reload_pending_state()
         if not self.pending_generation["active"]:
             return {"success": False, "error": "没有待确认的插件生成任务"}
 
@@ -2145,15 +2261,15 @@ class PluginGenerator:
                 )
                 metadata.setdefault("metadata", {})
                 metadata.setdefault("commands", [])
-                plugin_name = sanitize_plugin_name(
+                plugin_name = _canonical_plugin_name(
                     metadata.get("name", "astrbot_plugin_generated")
                 )
-                if not plugin_name.startswith("astrbot_plugin_"):
-                    plugin_name = f"astrbot_plugin_{plugin_name}"
                 metadata["name"] = plugin_name
 
                 # 检查插件是否已存在
-                if self.directory_detector.check_plugin_exists(plugin_name):
+                if await asyncio.to_thread(
+                    self.directory_detector.check_plugin_exists, plugin_name
+                ):
                     return {"success": False, "error": f"插件 '{plugin_name}' 已存在"}
                 await event.send(event.plain_result("元数据已重新生成"))
 
@@ -2166,39 +2282,46 @@ class PluginGenerator:
                 if feedback:
                     combined_description = f"{description}\n\n用户修改要求：{feedback}"
                 step_by_step = self.config.get("step_by_step", True)
+                bundled_config = None
                 if step_by_step:
                     metadata = await self.llm_handler.generate_metadata_structure(
                         combined_description
                     )
-                    metadata.setdefault("metadata", {})
-                    metadata.setdefault("commands", [])
-                    markdown_doc = await self.llm_handler.generate_markdown_document(
-                        metadata, combined_description
-                    )
                 else:
                     metadata = await self.llm_handler.generate_plugin_metadata(
                         combined_description
                     )
-                    metadata.setdefault("metadata", {})
-                    metadata.setdefault("commands", [])
-                    markdown_doc = metadata.get("markdown", "")
-                plugin_name = sanitize_plugin_name(
+                    bundled_config = metadata.pop("config_schema", None)
+                metadata.setdefault("metadata", {})
+                metadata.setdefault("commands", [])
+                plugin_name = _canonical_plugin_name(
                     metadata.get("name", "astrbot_plugin_generated")
                 )
-                if not plugin_name.startswith("astrbot_plugin_"):
-                    plugin_name = f"astrbot_plugin_{plugin_name}"
                 metadata["name"] = plugin_name
-                metadata["markdown"] = markdown_doc
 
                 # 检查插件是否已存在
-                if self.directory_detector.check_plugin_exists(plugin_name):
+                if await asyncio.to_thread(
+                    self.directory_detector.check_plugin_exists, plugin_name
+                ):
                     return {"success": False, "error": f"插件 '{plugin_name}' 已存在"}
 
-                # 重新生成配置
-                config_schema = await self.llm_handler.generate_config_schema(
-                    metadata, combined_description
+                # 文档与配置只依赖元数据和用户描述，并发生成
+                # （非分步模式下二者已随元数据生成）
+                steps = {}
+                if bundled_config is None:
+                    steps["config"] = self.llm_handler.generate_config_schema(
+                        metadata, combined_description
+                    )
+                if step_by_step:
+                    steps["markdown"] = self.llm_handler.generate_markdown_document(
+                        metadata, combined_description
+                    )
+                results = dict(zip(steps, await asyncio.gather(*steps.values())))
+                markdown_doc = results.get("markdown", metadata.get("markdown", ""))
+                metadata["markdown"] = markdown_doc
+                config_schema = self._normalize_config_schema(
+                    results.get("config", bundled_config)
                 )
-                config_schema = self._normalize_config_schema(config_schema)
 
                 await event.send(event.plain_result("整个插件方案已重新生成"))
             else:
@@ -2217,10 +2340,7 @@ class PluginGenerator:
                 }
             )
             # 持久化更新后的任务状态
-            try:
-                self._save_pending_state()
-            except Exception:
-                pass
+            await self._save_pending_state()
 
             # 显示更新后的方案（仅元数据信息），并以图片发送文档与配置
             await event.send(
@@ -3,17 +3,89 @@ CodeMage工具函数模块
 提供通用功能函数
 """
 
-import difflib
+import functools
 import json
 import os
 import re
 import time
 from typing import Any
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时回退到标准库 json
+    orjson = None
 
+
+def json_loads(data: str | bytes) -> Any:
+    """解析JSON，安装了 orjson 时使用 orjson 加速
+
+    Args:
+        data: JSON文本或UTF-8字节串
+
+    Returns:
+        Any: 解析结果
+
+    Raises:
+        json.JSONDecodeError: JSON格式不正确（orjson.JSONDecodeError 为其子类）
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any, indent: bool = True) -> str:
+    """序列化为JSON文本（不转义非ASCII字符），安装了 orjson 时使用 orjson 加速
+
+    Args:
+        obj: 待序列化对象
+        indent: 是否使用两个空格缩进
+
+    Returns:
+        str: JSON文本
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option).decode("utf-8")
+        except TypeError:
+            # orjson 不支持的类型（如超出64位的整数）交给标准库处理
+            pass
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    # 紧凑格式与 orjson 输出保持一致，避免输出随是否安装 orjson 而变化
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+# 插件描述中不允许出现的敏感词
+_SENSITIVE_WORDS_RE = re.compile(
+    "|".join(
+        (
+            "黑客",
+            "破解",
+            "攻击",
+            "病毒",
+            "木马",
+            "钓鱼",
+            "诈骗",
+            "赌博",
+            "色情",
+            "暴力",
+            "政治",
+            "反动",
+            "违法",
+        )
+    )
+)
+
+
+@functools.lru_cache(maxsize=256)
 def validate_plugin_description(description: str) -> bool:
     """验证插件描述是否合适
 
+    结果只取决于描述文本，用户在拒绝/重试后常会重复提交相同描述，因此按文本缓存。
+
     Args:
         description: 插件描述
 
@@ -23,29 +95,8 @@ def validate_plugin_description(description: str) -> bool:
     if not description or len(description.strip()) < 5:
         return False
 
-    # 检查是否包含敏感词
-    sensitive_words = [
-        "黑客",
-        "破解",
-        "攻击",
-        "病毒",
-        "木马",
-        "钓鱼",
-        "诈骗",
-        "赌博",
-        "色情",
-        "暴力",
-        "政治",
-        "反动",
-        "违法",
-    ]
-
-    description_lower = description.lower()
-    for word in sensitive_words:
-        if word in description_lower:
-            return False
-
-    return True
+    # 检查是否包含敏感词（单次扫描匹配全部敏感词）
+    return _SENSITIVE_WORDS_RE.search(description.lower()) is None
 
 
 def format_plugin_info(plugin_info: dict[str, Any]) -> str:
@@ -72,6 +123,11 @@ def format_plugin_info(plugin_info: dict[str, Any]) -> str:
     return "\n".join(info_lines)
 
 
+# 匹配 ```python ... ``` 或 ```json ... ``` 或 ``` ... ``` 格式的代码块
+_CODE_BLOCK_RE = re.compile(r"```(?:python|json)?\s*\n?(.*?)\n?```", re.DOTALL)
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
 def extract_code_blocks(text: str) -> list[str]:
     """从文本中提取代码块
 
@@ -81,10 +137,22 @@ def extract_code_blocks(text: str) -> list[str]:
     Returns:
         List[str]: 提取的代码块列表
     """
-    # 匹配 ```python ... ``` 或 ```json ... ``` 或 ``` ... ``` 格式的代码块
-    pattern = r"```(?:python|json)?\s*\n?(.*?)\n?```"
-    matches = re.findall(pattern, text, re.DOTALL)
-    return matches
+    return _CODE_BLOCK_RE.findall(text)
+
+
+def extract_first_code_block(text: str) -> str | None:
+    """提取文本中的第一个代码块
+
+    找到第一个闭合的代码块后立即返回，不再扫描剩余文本。
+
+    Args:
+        text: 包含代码块的文本
+
+    Returns:
+        Optional[str]: 第一个代码块内容，不存在返回None
+    """
+    match = _CODE_BLOCK_RE.search(text)
+    return match.group(1) if match else None
 
 
 def parse_json_response(text: str) -> dict[str, Any] | None:
@@ -98,13 +166,13 @@ def parse_json_response(text: str) -> dict[str, Any] | None:
     """
     try:
         # 尝试直接解析
-        return json.loads(text)
+        return json_loads(text)
     except json.JSONDecodeError:
         # 尝试提取JSON部分
-        json_match = re.search(r"\{.*\}", text, re.DOTALL)
+        json_match = _JSON_OBJECT_RE.search(text)
         if json_match:
             try:
-                return json.loads(json_match.group())
+                return json_loads(json_match.group())
             except json.JSONDecodeError:
                 pass
         return None
@@ -150,6 +218,20 @@ def generate_plugin_id(name: str) -> str:
     return f"{sanitized_name}_{timestamp}"
 
 
+def plugin_folder_name(plugin_name: str) -> str:
+    """获取插件目录名（统一带 astrbot_plugin_ 前缀）
+
+    Args:
+        plugin_name: 插件名称
+
+    Returns:
+        str: 插件目录名
+    """
+    if plugin_name.startswith("astrbot_plugin_"):
+        return plugin_name
+    return f"astrbot_plugin_{plugin_name}"
+
+
 def create_plugin_directory(base_path: str, plugin_name: str) -> str:
     """创建插件目录
 
@@ -160,12 +242,7 @@ def create_plugin_directory(base_path: str, plugin_name: str) -> str:
     Returns:
         str: 创建的目录路径
     """
-    folder_name = (
-        plugin_name
-        if plugin_name.startswith("astrbot_plugin_")
-        else f"astrbot_plugin_{plugin_name}"
-    )
-    plugin_dir = os.path.join(base_path, folder_name)
+    plugin_dir = os.path.join(base_path, plugin_folder_name(plugin_name))
     os.makedirs(plugin_dir, exist_ok=True)
     return plugin_dir
 
@@ -214,6 +291,12 @@ def format_time(timestamp: float) -> str:
     return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
 
 
+@functools.lru_cache(maxsize=16)
+def _codemage_block_re(tag_name: str) -> re.Pattern[str]:
+    """编译并缓存指定标签的 codemage 块正则"""
+    return re.compile(rf"<codemage:{tag_name}>(.*?)</codemage:{tag_name}>", re.DOTALL)
+
+
 def extract_codemage_block(text: str, tag_name: str) -> str | None:
     """提取 <codemage:tag>...</codemage:tag> 包裹的内容
 
@@ -226,11 +309,94 @@ def extract_codemage_block(text: str, tag_name: str) -> str | None:
     Returns:
         Optional[str]: 提取的内容，失败返回 None
     """
-    pattern = rf"<codemage:{tag_name}>(.*?)</codemage:{tag_name}>"
-    match = re.search(pattern, text, re.DOTALL)
+    match = _codemage_block_re(tag_name).search(text)
     return match.group(1).strip() if match else None
 
 
+# 整行图片与仅包含提示框标记（如 "> [!TIP]"）或空引用的行，对LLM没有信息量
+_MD_IMAGE_LINE = re.compile(r"^\s*!\[[^\]]*\]\([^)]*\)\s*$")
+_MD_EMPTY_QUOTE_LINE = re.compile(r"^>\s*(\[![A-Z]+\])?\s*$")
+
+
+def compact_markdown(text: str) -> str:
+    """压缩注入提示词的Markdown文档
+
+    去除整行图片、提示框标记行和空引用行，删除行尾空白，将连续空行合并为一行，
+    并把与前文完全相同的代码块替换为简短说明。代码块内部的内容（包括空行）保持不变。
+
+    Args:
+        text: Markdown文本
+
+    Returns:
+        str: 压缩后的文本
+    """
+    lines: list[str] = []
+    code: list[str] = []
+    seen_blocks: set[str] = set()
+    in_code = False
+    prev_blank = False
+    for line in text.splitlines():
+        line = line.rstrip()
+        if line.startswith("```"):
+            code.append(line)
+            if in_code:
+                block = "\n".join(code)
+                if block in seen_blocks:
+                    lines.append("（示例代码同上文）")
+                else:
+                    seen_blocks.add(block)
+                    lines.extend(code)
+                code = []
+            in_code = not in_code
+            prev_blank = False
+            continue
+        if in_code:
+            code.append(line)
+            continue
+        if _MD_IMAGE_LINE.match(line) or _MD_EMPTY_QUOTE_LINE.match(line):
+            continue
+        if not line:
+            if prev_blank:
+                continue
+            prev_blank = True
+        else:
+            prev_blank = False
+        lines.append(line)
+    # 未闭合的代码块原样保留
+    lines.extend(code)
+    return "\n".join(lines).strip()
+
+
+def split_markdown_sections(text: str) -> dict[str, str]:
+    """按一级标题拆分Markdown文档
+
+    代码块内以 ``# `` 开头的注释行不会被当作标题。
+
+    Args:
+        text: Markdown文本
+
+    Returns:
+        Dict[str, str]: 标题 -> 章节内容（包含标题行），按文档顺序排列
+    """
+    sections: dict[str, str] = {}
+    title = None
+    buffer: list[str] = []
+    in_code = False
+    for line in text.splitlines(keepends=True):
+        if line.startswith("```"):
+            in_code = not in_code
+        elif not in_code and line.startswith("# "):
+            if title is not None:
+                sections[title] = "".join(buffer).strip().removesuffix("---").strip()
+            title = line[2:].strip()
+            buffer = []
+        if title is not None:
+            buffer.append(line)
+    if title is not None:
+        sections[title] = "".join(buffer).strip().removesuffix("---").strip()
+    return sections
+
+
 def escape_markdown(text: str) -> str:
     """转义Markdown特殊字符
 
@@ -265,6 +431,12 @@ def escape_markdown(text: str) -> str:
     return text
 
 
+_SEARCH_REPLACE_RE = re.compile(
+    r"<<<<<<< SEARCH\n(.*?)\n=======\n(.*?)\n>>>>>>> REPLACE",
+    re.DOTALL,
+)
+
+
 def parse_search_replace_blocks(text: str) -> list[tuple[str, str]]:
     """解析 LLM 输出的 SEARCH/REPLACE 块。
 
@@ -282,11 +454,7 @@ def parse_search_replace_blocks(text: str) -> list[tuple[str, str]]:
         List[Tuple[str, str]]: (search, replace) 列表。
         解析失败或 LLM 未输出任何块时返回空列表。
     """
-    pattern = re.compile(
-        r"<<<<<<< SEARCH\n(.*?)\n=======\n(.*?)\n>>>>>>> REPLACE",
-        re.DOTALL,
-    )
-    return [(m.group(1), m.group(2)) for m in pattern.finditer(text)]
+    return [(m.group(1), m.group(2)) for m in _SEARCH_REPLACE_RE.finditer(text)]
 
 
 def _sliding_window_match(
@@ -307,6 +475,8 @@ def _sliding_window_match(
         Optional[Tuple[int, float]]: (窗口起始行号, 相似度)，低于阈值返回 None。
         行号以 0 开始。
     """
+    import difflib
+
     if not search_lines:
         return None
 
@@ -394,6 +564,8 @@ def apply_search_replace(
             f"SEARCH block not found in the file (no match above fuzzy threshold {fuzzy_threshold})",
         )
 
+    import difflib
+
     start_line, ratio = window_match
     # 把命中窗口替换为 replace；保留前后换行符不丢失
     # content_lines[start_line] 到 content_lines[start_line + size - 1] 是匹配窗口